@@ -4,90 +4,157 @@ Entry point untuk Crypto Trading Bot dengan struktur modular
 """
 
 import asyncio
+import atexit
 import logging
+import queue
 import sys
 import os
+import time
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 
 # Add project root to Python path
 project_root = Path(__file__).parent
 sys.path.insert(0, str(project_root))
 
-from telethon import TelegramClient
-from config import API_ID, API_HASH, BOT_TOKEN, ADMIN_ID
-from database import DatabaseManager
-from handlers.command_handlers import CommandHandlers
-from handlers.position_monitor import PositionMonitor
+# Config stays eager so env validation fails fast; heavy modules
+# (telethon, aiohttp, numpy, handlers) are imported in initialize()
+from config import (
+    API_ID, API_HASH, BOT_TOKEN, ADMIN_ID, SUPPORTED_SYMBOLS,
+    BOT_NAME, BOT_VERSION
+)
+
+# Setup logging: records go through a queue, file/console writes happen
+# on the QueueListener thread so the event loop never blocks on disk I/O
+_log_queue = queue.SimpleQueue()
+_log_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+_file_handler = logging.FileHandler('crypto_bot.log', encoding='utf-8', delay=True)
+_stream_handler = logging.StreamHandler()
+for _handler in (_file_handler, _stream_handler):
+    _handler.setFormatter(_log_formatter)
 
-# Setup logging
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('crypto_bot.log'),
-        logging.StreamHandler()
-    ]
+    handlers=[QueueHandler(_log_queue)]
 )
 
+_log_listener = QueueListener(_log_queue, _file_handler, _stream_handler)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
 logger = logging.getLogger(__name__)
 
+# Cached stats for startup notification (avoid re-querying on quick restarts)
+STARTUP_STATS_TTL = 300  # seconds
+
+# Startup notification template (header built once at import)
+STARTUP_TEMPLATE = f"""
+**{BOT_NAME} v{BOT_VERSION} Started**
+
+**System Status:**
+• Bot: ✅ Online
+• Database: ✅ Connected
+• Monitoring: ✅ Active
+
+**Statistics:**
+• Total Users: {{total_users}}
+• Active Users: {{active_users}}
+• Open Positions: {{open_positions}}
+
+**Startup Time:** {{uptime:.3f}}s
+
+Bot is ready to serve users! 🎯
+"""
+
 class CryptoTradingBot:
     def __init__(self):
         self.client = None
+        self.http = None
+        self.scraper = None
         self.db = None
         self.handlers = None
         self.monitor = None
+        self.notifier = None
+        self._monitor_task = None
         self.is_running = False
+        self._start_ns = time.monotonic_ns()
     
     async def initialize(self):
         """Initialize bot components"""
+        # Step messages are collected and emitted as one log record
+        log_lines = ["🚀 Initializing Crypto Trading Bot..."]
         try:
-            logger.info("🚀 Initializing Crypto Trading Bot...")
+            
+            from telethon import TelegramClient
+            from database import DatabaseManager
+            from handlers.command_handlers import CommandHandlers
+            from handlers.position_monitor import PositionMonitor
+            from handlers.admin_notifier import AdminNotifier
+            from scripts.tradingview_scraper import TradingViewScraper
             
             # Initialize Telegram client
             self.client = TelegramClient('crypto_bot_session', API_ID, API_HASH)
             
-            # Initialize database
+            # Shared HTTP session for all outbound REST calls (keep-alive pool)
+            self.http = TradingViewScraper.create_session(limit=32, limit_per_host=8)
+            # Single scraper for handlers and monitor so they share response caches
+            self.scraper = TradingViewScraper(session=self.http)
+            
+            # Initialize database and start Telegram client concurrently
             self.db = DatabaseManager()
-            await self.db.init_database()
-            logger.info("✅ Database initialized")
+            await asyncio.gather(
+                self.db.init_database(),
+                self.client.start(bot_token=BOT_TOKEN)
+            )
+            log_lines.append("✅ Database initialized")
+            log_lines.append("✅ Telegram client started")
             
             # Initialize command handlers
-            self.handlers = CommandHandlers(self.client, self.db)
+            self.handlers = CommandHandlers(self.client, self.db, http=self.http, scraper=self.scraper)
             self.handlers.register_handlers()
-            logger.info("✅ Command handlers registered")
+            log_lines.append("✅ Command handlers registered")
+            
+            # Initialize admin notifier (batches admin DMs)
+            self.notifier = AdminNotifier(self.client, ADMIN_ID)
+            self.notifier.start()
             
             # Initialize position monitor
-            self.monitor = PositionMonitor(self.client, self.db)
-            logger.info("✅ Position monitor initialized")
+            self.monitor = PositionMonitor(self.client, self.db, http=self.http, scraper=self.scraper)
+            # New or removed positions/alerts are picked up on the next tick
+            self.db.on_watchlist_change = self.monitor.wake
+            log_lines.append("✅ Position monitor initialized")
             
-            logger.info("🎉 Bot initialization completed")
+            log_lines.append("🎉 Bot initialization completed")
+            logger.info("\n".join(log_lines))
             
         except Exception as e:
-            logger.error(f"❌ Error initializing bot: {e}")
+            # Flush completed steps first so the failure is attributable
+            logger.info("\n".join(log_lines))
+            logger.error("❌ Error initializing bot: %s", e)
             raise
     
     async def start(self):
         """Start the bot"""
         try:
-            # Initialize components
+            # Initialize components (also starts Telegram client)
             await self.initialize()
             
-            # Start Telegram client
-            await self.client.start(bot_token=BOT_TOKEN)
-            logger.info("✅ Telegram client started")
-            
-            # Get bot info
-            me = await self.client.get_me()
-            logger.info(f"🤖 Bot started as @{me.username} (ID: {me.id})")
-            
-            # Send startup notification to admin
-            await self.send_startup_notification()
-            
             # Start position monitoring in background
-            asyncio.create_task(self.monitor.start_monitoring())
+            num_workers = min(len(SUPPORTED_SYMBOLS), 8)
+            self._monitor_task = asyncio.create_task(
+                self.monitor.start_monitoring(num_workers=num_workers),
+                name="position-monitor"
+            )
+            self._monitor_task.add_done_callback(self._on_monitor_done)
             logger.info("🔄 Position monitoring started")
             
+            # Get bot info and send startup notification to admin concurrently
+            me, _ = await asyncio.gather(
+                self.client.get_me(),
+                self.send_startup_notification()
+            )
+            logger.info("🤖 Bot started as @%s (ID: %s)", me.username, me.id)
+            
             self.is_running = True
             logger.info("🟢 Crypto Trading Bot is now running!")
             
@@ -95,40 +162,35 @@ class CryptoTradingBot:
             await self.client.run_until_disconnected()
             
         except Exception as e:
-            logger.error(f"❌ Error starting bot: {e}")
+            logger.error("❌ Error starting bot: %s", e)
             raise
         finally:
             await self.cleanup()
     
+    @staticmethod
+    def _on_monitor_done(task: asyncio.Task):
+        """Log monitor task crash instead of losing it until GC"""
+        if not task.cancelled() and task.exception():
+            logger.error("❌ Position monitor died: %s", task.exception())
+    
     async def send_startup_notification(self):
         """Send startup notification to admin"""
         try:
-            # Get bot statistics
-            stats = await self.db.get_stats()
+            # Get bot statistics (cached for STARTUP_STATS_TTL seconds)
+            stats = await self.db.get_stats_cached(ttl=STARTUP_STATS_TTL)
             
-            startup_msg = f"""
-🚀 **Crypto Trading Bot Started**
-
-**System Status:**
-• Bot: ✅ Online
-• Database: ✅ Connected
-• Monitoring: ✅ Active
-
-**Statistics:**
-• Total Users: {stats.get('total_users', 0)}
-• Active Users: {stats.get('active_users', 0)}
-• Open Positions: {stats.get('open_positions', 0)}
-
-**Startup Time:** {asyncio.get_event_loop().time()}
-
-Bot is ready to serve users! 🎯
-"""
+            startup_msg = STARTUP_TEMPLATE.format(
+                total_users=stats.get('total_users', 0),
+                active_users=stats.get('active_users', 0),
+                open_positions=stats.get('open_positions', 0),
+                uptime=(time.monotonic_ns() - self._start_ns) / 1e9
+            )
             
-            await self.client.send_message(ADMIN_ID, startup_msg)
-            logger.info("✅ Startup notification sent to admin")
+            self.notifier.enqueue(startup_msg)
+            logger.info("✅ Startup notification queued for admin")
             
         except Exception as e:
-            logger.error(f"Error sending startup notification: {e}")
+            logger.error("Error sending startup notification: %s", e)
     
     async def cleanup(self):
         """Cleanup resources on shutdown"""
@@ -138,23 +200,44 @@ Bot is ready to serve users! 🎯
             # Stop position monitoring
             if self.monitor:
                 self.monitor.stop_monitoring()
+            if self._monitor_task:
+                self._monitor_task.cancel()
+                await asyncio.gather(self._monitor_task, return_exceptions=True)
             
-            # Send shutdown notification to admin
-            if self.client and self.is_running:
+            # Send shutdown notification to admin (flushes any pending messages)
+            if self.notifier:
                 try:
-                    shutdown_msg = "🛑 **Crypto Trading Bot Shutdown**\n\nBot has been stopped."
-                    await self.client.send_message(ADMIN_ID, shutdown_msg)
-                except:
-                    pass
+                    if self.is_running:
+                        shutdown_msg = "🛑 **Crypto Trading Bot Shutdown**\n\nBot has been stopped."
+                        self.notifier.enqueue(shutdown_msg)
+                    # Don't let a hung Telegram connection block shutdown
+                    await asyncio.wait_for(self.notifier.stop(), timeout=2.0)
+                except asyncio.TimeoutError:
+                    logger.warning("Admin notifier stop timed out")
+                except Exception as e:
+                    logger.warning("Error stopping admin notifier: %s", e)
             
             # Close Telegram client
             if self.client:
-                await self.client.disconnect()
+                try:
+                    await asyncio.wait_for(self.client.disconnect(), timeout=5.0)
+                except asyncio.TimeoutError:
+                    logger.warning("Telegram disconnect timed out")
+            
+            # Close command handlers, then the shared HTTP session
+            if self.handlers:
+                await self.handlers.close()
+            if self.http:
+                await self.http.close()
+            
+            # Close database connection
+            if self.db:
+                await self.db.close()
             
             logger.info("✅ Bot shutdown completed")
             
         except Exception as e:
-            logger.error(f"Error during cleanup: {e}")
+            logger.error("Error during cleanup: %s", e)
 
 async def main():
     """Main entry point"""
@@ -165,14 +248,21 @@ async def main():
     except KeyboardInterrupt:
         logger.info("🛑 Bot stopped by user (Ctrl+C)")
     except Exception as e:
-        logger.error(f"❌ Fatal error: {e}")
+        logger.error("❌ Fatal error: %s", e)
         sys.exit(1)
 
 if __name__ == "__main__":
+    # Use uvloop when available (Linux/macOS), fallback to default asyncio loop
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+    
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
         print("\n🛑 Bot stopped by user")
     except Exception as e:
-        logger.error(f"❌ Failed to start bot: {e}")
+        logger.error("❌ Failed to start bot: %s", e)
         sys.exit(1)
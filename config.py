@@ -4,6 +4,7 @@ Contains all configuration constants and settings.
 """
 
 import os
+import re
 from typing import List
 from dotenv import load_dotenv
 
@@ -61,6 +62,10 @@ HELP_MESSAGE = """
 Ketik /analyze untuk mulai analisis!
 """
 
+# Command matcher: captures command name and the optional @botname suffix
+# (handlers ignore commands addressed to another bot)
+COMMAND_RE = re.compile(r"^/([a-zA-Z_]+)(?:@(\w+))?(?:\s|$)")
+
 # Trading Symbols
 SUPPORTED_SYMBOLS = [
     "BTCUSDT", "ETHUSDT", "BNBUSDT", "ADAUSDT", "XRPUSDT",
@@ -74,6 +79,9 @@ SUPPORTED_TIMEFRAMES = [
     "1m", "5m", "15m", "30m", "1h", "2h", "4h", "6h", "8h", "12h", "1d", "3d", "1w"
 ]
 
+# Lookup set for O(1) timeframe validation (the list above keeps display order)
+SUPPORTED_TIMEFRAMES_SET = frozenset(SUPPORTED_TIMEFRAMES)
+
 # Technical Analysis Settings
 RSI_PERIOD = 14
 RSI_OVERSOLD = 30
@@ -102,24 +110,49 @@ SIGNALS_TABLE = "signals_history"
 BROADCASTS_TABLE = "broadcasts"
 INTERACTIONS_TABLE = "user_interactions"
 
-# Environment Variables with Defaults
-def get_env_var(key: str, default: str = "") -> str:
-    """Get environment variable with default value."""
-    return os.getenv(key, default)
-
-# Load environment variables
-API_ID = int(get_env_var("API_ID", "0"))
-API_HASH = get_env_var("API_HASH")
-BOT_TOKEN = get_env_var("BOT_TOKEN")
-ADMIN_ID = int(get_env_var("ADMIN_ID", "0"))
+# Environment schema: (name, type, default, required)
+ENV_SCHEMA = (
+    ("API_ID", int, "0", True),
+    ("API_HASH", str, "", True),
+    ("BOT_TOKEN", str, "", True),
+    ("ADMIN_ID", int, "0", True),
+    ("DATABASE_PATH", str, "crypto_bot.db", False),
+    ("LOG_LEVEL", str, "INFO", False),
+    ("LOG_FILE", str, "crypto_bot.log", False),
+)
+
+REQUIRED_ENV_VARS = frozenset(name for name, _, _, required in ENV_SCHEMA if required)
+
+_env = os.environ
+
+# Validation: check presence before casting so a missing var is reported
+# as missing rather than as an int() parse error
+_missing = [name for name, *_ in ENV_SCHEMA if name in REQUIRED_ENV_VARS and not _env.get(name)]
+if _missing:
+    raise ValueError(
+        f"Missing required environment variables in .env file: {', '.join(_missing)}"
+    )
+
+# Load environment variables in a single pass over the schema
+_settings = {}
+for _name, _caster, _default, _required in ENV_SCHEMA:
+    _raw = _env.get(_name) or _default
+    try:
+        _settings[_name] = _caster(_raw)
+    except ValueError:
+        raise ValueError(f"Invalid value for {_name} in .env file: {_raw!r}") from None
 
-DATABASE_PATH = get_env_var("DATABASE_PATH", "crypto_bot.db")
-LOG_LEVEL = get_env_var("LOG_LEVEL", "INFO")
-LOG_FILE = get_env_var("LOG_FILE", "crypto_bot.log")
+# Environment Variables with Defaults
+API_ID = _settings["API_ID"]
+API_HASH = _settings["API_HASH"]
+BOT_TOKEN = _settings["BOT_TOKEN"]
+ADMIN_ID = _settings["ADMIN_ID"]
+DATABASE_PATH = _settings["DATABASE_PATH"]
+LOG_LEVEL = _settings["LOG_LEVEL"]
+LOG_FILE = _settings["LOG_FILE"]
 
-# Validation
-if not all([API_ID, API_HASH, BOT_TOKEN, ADMIN_ID]):
-    raise ValueError("Missing required environment variables in .env file")
+# Admin user ids for O(1) membership checks (single ADMIN_ID today)
+ADMIN_IDS = frozenset({ADMIN_ID})
 
 # Admin Commands
 ADMIN_COMMANDS = [
@@ -165,3 +198,11 @@ SUCCESS_POSITION_CLOSED = "✅ Posisi berhasil ditutup!"
 SUCCESS_ALERT_ADDED = "✅ Price alert berhasil ditambahkan!"
 SUCCESS_ALERT_REMOVED = "✅ Price alert berhasil dihapus!"
 SUCCESS_BROADCAST_SENT = "✅ Broadcast berhasil dikirim!"
+
+# Telegram message length limit
+MAX_MESSAGE_LENGTH = 4096
+
+# Validate static templates once at import so oversized messages fail fast
+for _name in ("WELCOME_MESSAGE", "HELP_MESSAGE"):
+    if len(globals()[_name]) > MAX_MESSAGE_LENGTH:
+        raise ValueError(f"{_name} exceeds Telegram limit of {MAX_MESSAGE_LENGTH} chars")
@@ -3,10 +3,16 @@ Database module for the modular crypto trading bot.
 Handles all database operations using SQLite with async support.
 """
 
+import os
 import sqlite3
 import asyncio
+import time
 import aiosqlite
-from typing import List, Dict, Optional, Any
+from cachetools import TTLCache
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from pathlib import Path
+from typing import AsyncIterator, Callable, List, Dict, Optional, Any
 from datetime import datetime
 import logging
 from config import DATABASE_PATH
@@ -14,32 +20,201 @@ from config import DATABASE_PATH
 # Setup logging
 logger = logging.getLogger(__name__)
 
+# Connection-level SQLite tuning (journal_mode=WAL is set on the file in init_database)
+CONNECTION_PRAGMAS = """
+    PRAGMA synchronous=NORMAL;
+    PRAGMA busy_timeout=5000;
+    PRAGMA temp_store=MEMORY;
+    PRAGMA cache_size=-64000;
+    PRAGMA mmap_size=268435456;
+"""
+
+INSERT_SIGNAL_SQL = """
+    INSERT INTO signals_history 
+    (symbol, timeframe, signal_type, price, rsi, macd, macd_signal,
+     ma_short, ma_long, bb_upper, bb_lower, volume, strength, 
+     take_profit, stop_loss, created_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# OR IGNORE: created_at is part of the PK and _interaction_ts() only increases
+# within a process, so a clock step back across a restart can repeat a key;
+# skip that row instead of failing the whole executemany batch
+INSERT_INTERACTION_SQL = """
+    INSERT OR IGNORE INTO user_interactions (user_id, interaction_type, data, created_at)
+    VALUES (?, ?, ?, ?)
+"""
+
+# Batched writer: flush queued rows every 100 ms or every 500 rows
+BATCH_FLUSH_INTERVAL = 0.1
+BATCH_MAX_ROWS = 500
+
+# last_active updates are coalesced and flushed every 5 s
+ACTIVITY_FLUSH_INTERVAL = 5.0
+
+# iter_all_users reads this many users per query (keyset on user_id)
+USER_PAGE_SIZE = 500
+
+# get_user lookups cached in memory (invalidated by add_user)
+USER_CACHE_SIZE = 10_000
+USER_CACHE_TTL = 60  # seconds
+
+# Background WAL checkpoint interval (autocheckpoint is disabled)
+WAL_CHECKPOINT_INTERVAL = 30.0
+
+# Timestamps are stored as INTEGER Unix seconds, passed in from Python
+EPOCH_NOW_SQL = "(CAST(strftime('%s', 'now') AS INTEGER))"
+
+# (table, columns) holding timestamps; migrated from TEXT once via user_version
+TIMESTAMP_COLUMNS = (
+    ('users', ('created_at', 'last_active')),
+    ('positions', ('created_at', 'closed_at')),
+    ('alerts', ('created_at', 'triggered_at')),
+    ('signals_history', ('created_at',)),
+    ('signals_history_archive', ('created_at',)),
+    ('broadcasts', ('created_at', 'completed_at')),
+    ('user_interactions', ('created_at',)),  # milliseconds since schema v2
+)
+SCHEMA_VERSION = 2
+
+# user_interactions is clustered by (user_id, created_at) with created_at in
+# milliseconds; rows for one user sit next to each other in the B-tree
+INTERACTIONS_COLUMNS_DDL = """
+    user_id INTEGER NOT NULL,
+    created_at INTEGER NOT NULL, -- Unix milliseconds
+    interaction_type TEXT NOT NULL, -- 'command', 'callback', 'message'
+    data TEXT,
+    PRIMARY KEY (user_id, created_at),
+    FOREIGN KEY (user_id) REFERENCES users (user_id)
+"""
+
+# signals_history keeps only the hot tail; older rows move to the archive
+SIGNALS_HOT_WINDOW = 86400  # seconds
+SIGNALS_ARCHIVE_INTERVAL = 3600.0  # seconds
+
+# Max ids per "IN (...)" clause (below SQLite's default variable limit)
+SQL_MAX_IN_PARAMS = 500
+
+# Keys returned by get_stats, in query column order
+STATS_KEYS = (
+    'total_users', 'active_users', 'total_positions',
+    'open_positions', 'active_alerts', 'total_signals'
+)
+
+# Columns the position monitor needs (narrower than SELECT *)
+MONITOR_POSITION_COLUMNS = (
+    "id, user_id, symbol, position_type, entry_price, quantity, "
+    "take_profit, stop_loss, current_price, timeframe"
+)
+
+# Prepared statements kept per connection; SQL strings are constant so
+# repeat calls reuse the compiled statement instead of re-parsing
+STATEMENT_CACHE_SIZE = 256
+
+# Number of read-only connections for parallel get_* queries
+READ_POOL_SIZE = min(os.cpu_count() or 1, 4)
+
+# Columns update_position is allowed to write
+ALLOWED_POSITION_COLUMNS = frozenset({
+    'current_price', 'pnl', 'status', 'take_profit', 'stop_loss', 'closed_at'
+})
+
+@lru_cache(maxsize=64)
+def _build_position_update_sql(columns: tuple) -> str:
+    """Build UPDATE statement for a sorted tuple of validated column names."""
+    set_clause = ", ".join(f"{col} = ?" for col in columns)
+    return f"UPDATE positions SET {set_clause} WHERE id = ?"
+
 class DatabaseManager:
     """Async database manager for the crypto trading bot."""
     
     def __init__(self, db_path: str = DATABASE_PATH):
         self.db_path = db_path
         self._lock = asyncio.Lock()
+        self._conn: Optional[aiosqlite.Connection] = None
+        self._read_pool: Optional[asyncio.Queue] = None
+        self._pending_signals: List[tuple] = []
+        self._pending_interactions: List[tuple] = []
+        self._last_interaction_ms = 0
+        self._batch_full = asyncio.Event()
+        self._batch_task: Optional[asyncio.Task] = None
+        self._batch_flush: Optional[asyncio.Task] = None
+        self._activity_dirty: set = set()
+        self._user_cache: TTLCache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+        self._activity_task: Optional[asyncio.Task] = None
+        self._activity_flush: Optional[asyncio.Task] = None
+        self._checkpoint_task: Optional[asyncio.Task] = None
+        self._archive_task: Optional[asyncio.Task] = None
+        self._stats_cache: Optional[Dict[str, Any]] = None
+        self._stats_cache_ts = 0.0
+        # Called after positions/alerts are added or removed (PositionMonitor.wake)
+        self.on_watchlist_change: Optional[Callable[[], None]] = None
+    
+    @asynccontextmanager
+    async def _write(self):
+        """Serialize a write transaction on the shared connection."""
+        async with self._lock:
+            try:
+                yield self._conn
+            except Exception:
+                await self._conn.rollback()
+                raise
+    
+    @asynccontextmanager
+    async def _read(self):
+        """Check out a read-only connection from the pool."""
+        if self._read_pool is None:
+            # No pool (e.g. :memory:), fall back to the shared connection
+            yield self._conn
+            return
+        
+        conn = await self._read_pool.get()
+        try:
+            yield conn
+        finally:
+            self._read_pool.put_nowait(conn)
+    
+    async def _open_read_pool(self, size: int):
+        """Open read-only connections; under WAL they don't block the writer."""
+        uri = f"{Path(self.db_path).absolute().as_uri()}?mode=ro"
+        self._read_pool = asyncio.Queue()
+        for _ in range(size):
+            conn = await aiosqlite.connect(uri, uri=True, cached_statements=STATEMENT_CACHE_SIZE)
+            conn.row_factory = aiosqlite.Row
+            await conn.executescript(CONNECTION_PRAGMAS)
+            await conn.execute("PRAGMA query_only=1")
+            self._read_pool.put_nowait(conn)
     
     async def init_database(self):
         """Initialize database with required tables."""
-        async with aiosqlite.connect(self.db_path) as db:
+        # Single long-lived connection reused by every method
+        self._conn = await aiosqlite.connect(self.db_path, cached_statements=STATEMENT_CACHE_SIZE)
+        self._conn.row_factory = aiosqlite.Row
+        await self._conn.executescript(CONNECTION_PRAGMAS)
+        
+        async with self._write() as db:
+            if self.db_path != ':memory:':
+                await db.execute("PRAGMA journal_mode=WAL")
+                # Checkpoints run from a background task instead of inline on commit
+                await db.execute("PRAGMA wal_autocheckpoint=0")
+                await db.commit()
+            
             # Users table
-            await db.execute("""
+            await db.execute(f"""
                 CREATE TABLE IF NOT EXISTS users (
                     user_id INTEGER PRIMARY KEY,
                     username TEXT,
                     first_name TEXT,
                     last_name TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    last_active TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    settings TEXT DEFAULT '{}',
+                    created_at INTEGER DEFAULT {EPOCH_NOW_SQL},
+                    last_active INTEGER DEFAULT {EPOCH_NOW_SQL},
+                    settings TEXT DEFAULT '{{}}',
                     is_active INTEGER DEFAULT 1
                 )
             """)
             
             # Positions table
-            await db.execute("""
+            await db.execute(f"""
                 CREATE TABLE IF NOT EXISTS positions (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     user_id INTEGER,
@@ -53,14 +228,14 @@ class DatabaseManager:
                     pnl REAL DEFAULT 0,
                     status TEXT DEFAULT 'open', -- 'open', 'closed', 'tp_hit', 'sl_hit'
                     timeframe TEXT NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    closed_at TIMESTAMP,
+                    created_at INTEGER DEFAULT {EPOCH_NOW_SQL},
+                    closed_at INTEGER,
                     FOREIGN KEY (user_id) REFERENCES users (user_id)
                 )
             """)
             
             # Price alerts table
-            await db.execute("""
+            await db.execute(f"""
                 CREATE TABLE IF NOT EXISTS alerts (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     user_id INTEGER,
@@ -70,14 +245,14 @@ class DatabaseManager:
                     current_price REAL,
                     message TEXT,
                     is_triggered INTEGER DEFAULT 0,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    triggered_at TIMESTAMP,
+                    created_at INTEGER DEFAULT {EPOCH_NOW_SQL},
+                    triggered_at INTEGER,
                     FOREIGN KEY (user_id) REFERENCES users (user_id)
                 )
             """)
             
             # Signals history table
-            await db.execute("""
+            await db.execute(f"""
                 CREATE TABLE IF NOT EXISTS signals_history (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     symbol TEXT NOT NULL,
@@ -95,12 +270,35 @@ class DatabaseManager:
                     strength INTEGER, -- 1-5 signal strength
                     take_profit REAL,
                     stop_loss REAL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    created_at INTEGER DEFAULT {EPOCH_NOW_SQL}
                 )
             """)
             
-            # Broadcasts table
+            # Signals archive (rows moved out of signals_history by the archiver)
             await db.execute("""
+                CREATE TABLE IF NOT EXISTS signals_history_archive (
+                    id INTEGER PRIMARY KEY,
+                    symbol TEXT NOT NULL,
+                    timeframe TEXT NOT NULL,
+                    signal_type TEXT NOT NULL,
+                    price REAL NOT NULL,
+                    rsi REAL,
+                    macd REAL,
+                    macd_signal REAL,
+                    ma_short REAL,
+                    ma_long REAL,
+                    bb_upper REAL,
+                    bb_lower REAL,
+                    volume REAL,
+                    strength INTEGER,
+                    take_profit REAL,
+                    stop_loss REAL,
+                    created_at INTEGER
+                )
+            """)
+            
+            # Broadcasts table
+            await db.execute(f"""
                 CREATE TABLE IF NOT EXISTS broadcasts (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     admin_id INTEGER,
@@ -108,174 +306,449 @@ class DatabaseManager:
                     total_users INTEGER DEFAULT 0,
                     successful_sends INTEGER DEFAULT 0,
                     failed_sends INTEGER DEFAULT 0,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    completed_at TIMESTAMP
+                    created_at INTEGER DEFAULT {EPOCH_NOW_SQL},
+                    completed_at INTEGER
                 )
             """)
             
             # User interactions table
+            await db.execute(f"""
+                CREATE TABLE IF NOT EXISTS user_interactions ({INTERACTIONS_COLUMNS_DDL}) WITHOUT ROWID
+            """)
+            
+            await self._migrate_schema(db)
+            
+            # O(1) totals for get_stats, maintained by insert triggers. Seeded
+            # from a full count only when the counter row doesn't exist yet.
+            # Moving signals to the archive doesn't touch the counter, so it
+            # keeps counting hot + archive.
+            await db.executescript("""
+                CREATE TABLE IF NOT EXISTS stats_counters (
+                    name TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL DEFAULT 0
+                );
+                INSERT INTO stats_counters (name, value)
+                    SELECT 'signals',
+                        (SELECT COUNT(*) FROM signals_history)
+                        + (SELECT COUNT(*) FROM signals_history_archive)
+                    WHERE NOT EXISTS (SELECT 1 FROM stats_counters WHERE name = 'signals');
+                INSERT INTO stats_counters (name, value)
+                    SELECT 'positions', (SELECT COUNT(*) FROM positions)
+                    WHERE NOT EXISTS (SELECT 1 FROM stats_counters WHERE name = 'positions');
+                CREATE TRIGGER IF NOT EXISTS signals_count_ins AFTER INSERT ON signals_history
+                BEGIN
+                    UPDATE stats_counters SET value = value + 1 WHERE name = 'signals';
+                END;
+                CREATE TRIGGER IF NOT EXISTS positions_count_ins AFTER INSERT ON positions
+                BEGIN
+                    UPDATE stats_counters SET value = value + 1 WHERE name = 'positions';
+                END;
+                CREATE TRIGGER IF NOT EXISTS positions_count_del AFTER DELETE ON positions
+                BEGIN
+                    UPDATE stats_counters SET value = value - 1 WHERE name = 'positions';
+                END;
+            """)
+            
+            # Partial index so the active-users count is an index scan
             await db.execute("""
-                CREATE TABLE IF NOT EXISTS user_interactions (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER,
-                    interaction_type TEXT NOT NULL, -- 'command', 'callback', 'message'
-                    data TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (user_id) REFERENCES users (user_id)
-                )
+                CREATE INDEX IF NOT EXISTS idx_users_active
+                ON users(is_active) WHERE is_active = 1
+            """)
+            
+            # Indexes for hot WHERE/ORDER BY predicates
+            await db.executescript("""
+                CREATE INDEX IF NOT EXISTS idx_positions_user_status_created
+                    ON positions(user_id, status, created_at DESC);
+                CREATE INDEX IF NOT EXISTS idx_positions_status_created
+                    ON positions(status, created_at);
+                CREATE INDEX IF NOT EXISTS idx_alerts_user_trig
+                    ON alerts(user_id, is_triggered, created_at DESC);
+                CREATE INDEX IF NOT EXISTS idx_alerts_trig
+                    ON alerts(is_triggered, created_at);
+                CREATE INDEX IF NOT EXISTS idx_signals_symbol_created
+                    ON signals_history(symbol, created_at DESC);
+                CREATE INDEX IF NOT EXISTS idx_signals_created_desc
+                    ON signals_history(created_at DESC);
+                CREATE INDEX IF NOT EXISTS idx_signals_archive_symbol_created
+                    ON signals_history_archive(symbol, created_at DESC);
+                CREATE INDEX IF NOT EXISTS idx_signals_archive_created
+                    ON signals_history_archive(created_at DESC);
+                ANALYZE;
             """)
             
             await db.commit()
             logger.info("Database initialized successfully")
+        
+        if self.db_path != ':memory:':
+            await self._open_read_pool(READ_POOL_SIZE)
+            self._checkpoint_task = asyncio.create_task(self._checkpoint_loop(), name="db-wal-checkpoint")
+        
+        self._batch_task = asyncio.create_task(self._batch_writer_loop(), name="db-batch-writer")
+        self._activity_task = asyncio.create_task(self._activity_flush_loop(), name="db-activity-flush")
+        self._archive_task = asyncio.create_task(self._archive_loop(), name="db-signals-archiver")
+    
+    async def _migrate_schema(self, db):
+        """One-shot migrations for databases created by older versions."""
+        async with db.execute("PRAGMA user_version") as cursor:
+            version = (await cursor.fetchone())[0]
+        if version >= SCHEMA_VERSION:
+            return
+        
+        if version < 1:
+            # Legacy TEXT timestamps -> Unix seconds
+            for table, columns in TIMESTAMP_COLUMNS:
+                for col in columns:
+                    await db.execute(f"""
+                        UPDATE {table} SET {col} = CAST(strftime('%s', {col}) AS INTEGER)
+                        WHERE typeof({col}) = 'text'
+                    """)
+            logger.info("Migrated timestamps to Unix seconds")
+        
+        if version < 2:
+            # Rebuild rowid user_interactions as WITHOUT ROWID; the old id
+            # spreads same-second rows across distinct milliseconds
+            async with db.execute("PRAGMA table_info(user_interactions)") as cursor:
+                columns = {row[1] for row in await cursor.fetchall()}
+            if 'id' in columns:
+                await db.execute(
+                    f"CREATE TABLE user_interactions_new ({INTERACTIONS_COLUMNS_DDL}) WITHOUT ROWID"
+                )
+                await db.execute("""
+                    INSERT OR IGNORE INTO user_interactions_new
+                    (user_id, created_at, interaction_type, data)
+                    SELECT COALESCE(user_id, 0), created_at * 1000 + id % 1000, interaction_type, data
+                    FROM user_interactions
+                """)
+                await db.execute("DROP TABLE user_interactions")
+                await db.execute("ALTER TABLE user_interactions_new RENAME TO user_interactions")
+                logger.info("Rebuilt user_interactions as WITHOUT ROWID")
+        
+        await db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    
+    def _interaction_ts(self) -> int:
+        """Strictly increasing millisecond timestamp (part of the interactions PK)."""
+        ts = max(time.time_ns() // 1_000_000, self._last_interaction_ms + 1)
+        self._last_interaction_ms = ts
+        return ts
+    
+    async def close(self):
+        """Close the shared database connection."""
+        if self._batch_task:
+            self._batch_task.cancel()
+            await asyncio.gather(self._batch_task, return_exceptions=True)
+            self._batch_task = None
+            # Let a flush the loop had in flight finish before the final one
+            if self._batch_flush:
+                await asyncio.gather(self._batch_flush, return_exceptions=True)
+                self._batch_flush = None
+            await self.flush_pending()
+        if self._activity_task:
+            self._activity_task.cancel()
+            await asyncio.gather(self._activity_task, return_exceptions=True)
+            self._activity_task = None
+            if self._activity_flush:
+                await asyncio.gather(self._activity_flush, return_exceptions=True)
+                self._activity_flush = None
+            await self.flush_user_activity()
+        if self._archive_task:
+            self._archive_task.cancel()
+            await asyncio.gather(self._archive_task, return_exceptions=True)
+            self._archive_task = None
+        if self._checkpoint_task:
+            self._checkpoint_task.cancel()
+            await asyncio.gather(self._checkpoint_task, return_exceptions=True)
+            self._checkpoint_task = None
+            await self.checkpoint("TRUNCATE")
+        if self._read_pool is not None:
+            while not self._read_pool.empty():
+                await self._read_pool.get_nowait().close()
+            self._read_pool = None
+        if self._conn:
+            await self._conn.close()
+            self._conn = None
+    
+    async def checkpoint(self, mode: str = "PASSIVE"):
+        """Run a WAL checkpoint (PASSIVE never blocks readers or the writer)."""
+        try:
+            async with self._write() as db:
+                await db.execute(f"PRAGMA wal_checkpoint({mode})")
+        except Exception as e:
+            logger.error("Error running WAL checkpoint: %s", e)
+    
+    async def _checkpoint_loop(self):
+        """Checkpoint the WAL every WAL_CHECKPOINT_INTERVAL seconds."""
+        while True:
+            await asyncio.sleep(WAL_CHECKPOINT_INTERVAL)
+            await self.checkpoint()
+    
+    async def archive_signals(self) -> int:
+        """Move signals older than SIGNALS_HOT_WINDOW into the archive table."""
+        try:
+            async with self._write() as db:
+                cutoff = int(time.time()) - SIGNALS_HOT_WINDOW
+                await db.execute("""
+                    INSERT INTO signals_history_archive
+                    SELECT * FROM signals_history WHERE created_at < ?
+                """, (cutoff,))
+                cursor = await db.execute(
+                    "DELETE FROM signals_history WHERE created_at < ?", (cutoff,)
+                )
+                await db.commit()
+                return cursor.rowcount
+        except Exception as e:
+            logger.error("Error archiving signals: %s", e)
+            return 0
+    
+    async def _archive_loop(self):
+        """Archive old signals every SIGNALS_ARCHIVE_INTERVAL seconds."""
+        while True:
+            await asyncio.sleep(SIGNALS_ARCHIVE_INTERVAL)
+            moved = await self.archive_signals()
+            if moved:
+                logger.info("Archived %s signals", moved)
     
     # Users management
     async def add_user(self, user_id: int, username: str = None, 
                       first_name: str = None, last_name: str = None) -> bool:
         """Add or update user in database."""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            now = int(time.time())
+            async with self._write() as db:
                 await db.execute("""
-                    INSERT OR REPLACE INTO users 
-                    (user_id, username, first_name, last_name, last_active)
-                    VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
-                """, (user_id, username, first_name, last_name))
+                    INSERT INTO users 
+                    (user_id, username, first_name, last_name, created_at, last_active)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(user_id) DO UPDATE SET
+                        username = excluded.username,
+                        first_name = excluded.first_name,
+                        last_name = excluded.last_name,
+                        last_active = excluded.last_active
+                """, (user_id, username, first_name, last_name, now, now))
                 await db.commit()
+                self._user_cache.pop(user_id, None)
+                self.clear_stats_cache()
                 return True
         except Exception as e:
-            logger.error(f"Error adding user {user_id}: {e}")
+            logger.error("Error adding user %s: %s", user_id, e)
             return False
     
     async def get_user(self, user_id: int) -> Optional[Dict[str, Any]]:
         """Get user by ID."""
+        cached = self._user_cache.get(user_id)
+        if cached is not None:
+            return cached
+        
         try:
-            async with aiosqlite.connect(self.db_path) as db:
-                db.row_factory = aiosqlite.Row
+            async with self._read() as db:
                 async with db.execute(
                     "SELECT * FROM users WHERE user_id = ?", (user_id,)
                 ) as cursor:
                     row = await cursor.fetchone()
-                    return dict(row) if row else None
+                    if not row:
+                        return None
+                    user = dict(row)
+                    self._user_cache[user_id] = user
+                    return user
         except Exception as e:
-            logger.error(f"Error getting user {user_id}: {e}")
+            logger.error("Error getting user %s: %s", user_id, e)
             return None
     
     async def get_all_users(self, active_only: bool = True) -> List[Dict[str, Any]]:
         """Get all users."""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
-                db.row_factory = aiosqlite.Row
+            async with self._read() as db:
                 query = "SELECT * FROM users"
                 if active_only:
                     query += " WHERE is_active = 1"
                 
                 async with db.execute(query) as cursor:
                     rows = await cursor.fetchall()
-                    return [dict(row) for row in rows]
+                    return list(map(dict, rows))
         except Exception as e:
-            logger.error(f"Error getting all users: {e}")
+            logger.error("Error getting all users: %s", e)
             return []
     
+    async def iter_all_users(self, active_only: bool = True) -> AsyncIterator[Dict[str, Any]]:
+        """Stream users a page at a time; the read connection is released between
+        pages so a slow consumer never holds a cursor open (and blocks checkpoints)."""
+        query = "SELECT * FROM users WHERE user_id > ?"
+        if active_only:
+            query += " AND is_active = 1"
+        query += " ORDER BY user_id LIMIT ?"
+        
+        last_id = -(1 << 63)
+        while True:
+            async with self._read() as db:
+                async with db.execute(query, (last_id, USER_PAGE_SIZE)) as cursor:
+                    rows = await cursor.fetchall()
+            for row in rows:
+                yield dict(row)
+            if len(rows) < USER_PAGE_SIZE:
+                return
+            last_id = rows[-1]['user_id']
+    
+    async def count_users(self, active_only: bool = True) -> int:
+        """Count users without fetching them."""
+        try:
+            async with self._read() as db:
+                query = "SELECT COUNT(*) FROM users"
+                if active_only:
+                    query += " WHERE is_active = 1"
+                
+                async with db.execute(query) as cursor:
+                    return (await cursor.fetchone())[0]
+        except Exception as e:
+            logger.error("Error counting users: %s", e)
+            return 0
+    
     async def update_user_activity(self, user_id: int) -> bool:
-        """Update user's last activity timestamp."""
+        """Mark user as active; timestamp is written on the next periodic flush."""
+        self._activity_dirty.add(user_id)
+        self._user_cache.pop(user_id, None)
+        return True
+    
+    async def flush_user_activity(self) -> bool:
+        """Write last_active for all users marked since the previous flush."""
+        if not self._activity_dirty:
+            return True
+        
+        user_ids = list(self._activity_dirty)
+        self._activity_dirty.clear()
+        now = int(time.time())
         try:
-            async with aiosqlite.connect(self.db_path) as db:
-                await db.execute(
-                    "UPDATE users SET last_active = CURRENT_TIMESTAMP WHERE user_id = ?",
-                    (user_id,)
-                )
+            async with self._write() as db:
+                for i in range(0, len(user_ids), SQL_MAX_IN_PARAMS):
+                    chunk = user_ids[i:i + SQL_MAX_IN_PARAMS]
+                    placeholders = ",".join("?" * len(chunk))
+                    await db.execute(
+                        f"UPDATE users SET last_active = ? WHERE user_id IN ({placeholders})",
+                        [now] + chunk
+                    )
                 await db.commit()
                 return True
         except Exception as e:
-            logger.error(f"Error updating user activity {user_id}: {e}")
+            logger.error("Error flushing user activity: %s", e)
             return False
     
+    async def _activity_flush_loop(self):
+        """Flush coalesced user activity every ACTIVITY_FLUSH_INTERVAL seconds."""
+        while True:
+            await asyncio.sleep(ACTIVITY_FLUSH_INTERVAL)
+            # Shielded like the batch writer; close() awaits the in-flight flush
+            self._activity_flush = asyncio.ensure_future(self.flush_user_activity())
+            await asyncio.shield(self._activity_flush)
+    
     # Positions management
     async def add_position(self, user_id: int, symbol: str, position_type: str,
                           entry_price: float, quantity: float, timeframe: str,
                           take_profit: float = None, stop_loss: float = None) -> Optional[int]:
         """Add new trading position."""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self._write() as db:
                 cursor = await db.execute("""
                     INSERT INTO positions 
-                    (user_id, symbol, position_type, entry_price, quantity, timeframe, take_profit, stop_loss)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                """, (user_id, symbol, position_type, entry_price, quantity, timeframe, take_profit, stop_loss))
+                    (user_id, symbol, position_type, entry_price, quantity, timeframe, take_profit, stop_loss, created_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, (user_id, symbol, position_type, entry_price, quantity, timeframe, take_profit, stop_loss,
+                      int(time.time())))
                 await db.commit()
+                self.clear_stats_cache()
+                self._watchlist_changed()
                 return cursor.lastrowid
         except Exception as e:
-            logger.error(f"Error adding position: {e}")
+            logger.error("Error adding position: %s", e)
             return None
     
     async def get_user_positions(self, user_id: int, status: str = 'open') -> List[Dict[str, Any]]:
         """Get user's positions by status."""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
-                db.row_factory = aiosqlite.Row
+            async with self._read() as db:
                 async with db.execute("""
                     SELECT * FROM positions 
                     WHERE user_id = ? AND status = ?
                     ORDER BY created_at DESC
                 """, (user_id, status)) as cursor:
                     rows = await cursor.fetchall()
-                    return [dict(row) for row in rows]
+                    return list(map(dict, rows))
         except Exception as e:
-            logger.error(f"Error getting user positions: {e}")
+            logger.error("Error getting user positions: %s", e)
             return []
     
+    async def get_position_by_id(self, position_id: int) -> Optional[Dict[str, Any]]:
+        """Get a single position by ID."""
+        try:
+            async with self._read() as db:
+                async with db.execute(
+                    "SELECT * FROM positions WHERE id = ?", (position_id,)
+                ) as cursor:
+                    row = await cursor.fetchone()
+                    return dict(row) if row else None
+        except Exception as e:
+            logger.error("Error getting position %s: %s", position_id, e)
+            return None
+    
     async def update_position(self, position_id: int, **kwargs) -> bool:
         """Update position with given parameters."""
         try:
             if not kwargs:
                 return False
             
-            set_clause = ", ".join([f"{key} = ?" for key in kwargs.keys()])
-            values = list(kwargs.values()) + [position_id]
+            invalid = kwargs.keys() - ALLOWED_POSITION_COLUMNS
+            if invalid:
+                raise ValueError(f"Invalid position columns: {', '.join(sorted(invalid))}")
+            
+            columns = tuple(sorted(kwargs))
+            values = [kwargs[col] for col in columns] + [position_id]
             
-            async with aiosqlite.connect(self.db_path) as db:
-                await db.execute(f"""
-                    UPDATE positions SET {set_clause} WHERE id = ?
-                """, values)
+            async with self._write() as db:
+                await db.execute(_build_position_update_sql(columns), values)
                 await db.commit()
+                if 'status' in kwargs:
+                    self.clear_stats_cache()
                 return True
         except Exception as e:
-            logger.error(f"Error updating position {position_id}: {e}")
+            logger.error("Error updating position %s: %s", position_id, e)
+            return False
+    
+    async def update_positions_batch(self, rows: List[tuple]) -> bool:
+        """Update many (current_price, pnl, position_id) rows in one transaction."""
+        if not rows:
+            return True
+        try:
+            async with self._write() as db:
+                await db.executemany(
+                    "UPDATE positions SET current_price = ?, pnl = ? WHERE id = ?", rows
+                )
+                await db.commit()
+                return True
+        except Exception as e:
+            logger.error("Error updating positions batch: %s", e)
             return False
     
     async def close_position(self, position_id: int, close_price: float, 
                            status: str = 'closed') -> bool:
         """Close a trading position."""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
-                # Get position details first
-                async with db.execute(
-                    "SELECT * FROM positions WHERE id = ?", (position_id,)
-                ) as cursor:
-                    position = await cursor.fetchone()
-                    
-                if not position:
-                    return False
-                
-                # Calculate PnL
-                entry_price = position[4]  # entry_price column
-                quantity = position[5]     # quantity column
-                position_type = position[3] # position_type column
-                
-                if position_type == 'long':
-                    pnl = (close_price - entry_price) * quantity
-                else:  # short
-                    pnl = (entry_price - close_price) * quantity
-                
-                # Update position
-                await db.execute("""
+            async with self._write() as db:
+                # PnL computed in SQL so close is a single UPDATE
+                cursor = await db.execute("""
                     UPDATE positions 
-                    SET current_price = ?, pnl = ?, status = ?, closed_at = CURRENT_TIMESTAMP
+                    SET current_price = ?, status = ?, closed_at = ?,
+                        pnl = CASE position_type
+                            WHEN 'long' THEN (? - entry_price) * quantity
+                            ELSE (entry_price - ?) * quantity
+                        END
                     WHERE id = ?
-                """, (close_price, pnl, status, position_id))
+                """, (close_price, status, int(time.time()), close_price, close_price, position_id))
                 await db.commit()
+                
+                if cursor.rowcount == 0:
+                    return False
+                
+                self.clear_stats_cache()
                 return True
         except Exception as e:
-            logger.error(f"Error closing position {position_id}: {e}")
+            logger.error("Error closing position %s: %s", position_id, e)
             return False
     
     # Alerts management
@@ -283,23 +756,24 @@ class DatabaseManager:
                        target_price: float, message: str = None) -> Optional[int]:
         """Add price alert."""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self._write() as db:
                 cursor = await db.execute("""
                     INSERT INTO alerts 
-                    (user_id, symbol, alert_type, target_price, message)
-                    VALUES (?, ?, ?, ?, ?)
-                """, (user_id, symbol, alert_type, target_price, message))
+                    (user_id, symbol, alert_type, target_price, message, created_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, (user_id, symbol, alert_type, target_price, message, int(time.time())))
                 await db.commit()
+                self.clear_stats_cache()
+                self._watchlist_changed()
                 return cursor.lastrowid
         except Exception as e:
-            logger.error(f"Error adding alert: {e}")
+            logger.error("Error adding alert: %s", e)
             return None
     
     async def get_user_alerts(self, user_id: int, active_only: bool = True) -> List[Dict[str, Any]]:
         """Get user's alerts."""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
-                db.row_factory = aiosqlite.Row
+            async with self._read() as db:
                 query = "SELECT * FROM alerts WHERE user_id = ?"
                 params = [user_id]
                 
@@ -310,46 +784,46 @@ class DatabaseManager:
                 
                 async with db.execute(query, params) as cursor:
                     rows = await cursor.fetchall()
-                    return [dict(row) for row in rows]
+                    return list(map(dict, rows))
         except Exception as e:
-            logger.error(f"Error getting user alerts: {e}")
+            logger.error("Error getting user alerts: %s", e)
             return []
     
     async def get_all_active_alerts(self) -> List[Dict[str, Any]]:
         """Get all active alerts for monitoring."""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
-                db.row_factory = aiosqlite.Row
+            async with self._read() as db:
                 async with db.execute("""
                     SELECT * FROM alerts 
                     WHERE is_triggered = 0
                     ORDER BY created_at ASC
                 """) as cursor:
                     rows = await cursor.fetchall()
-                    return [dict(row) for row in rows]
+                    return list(map(dict, rows))
         except Exception as e:
-            logger.error(f"Error getting active alerts: {e}")
+            logger.error("Error getting active alerts: %s", e)
             return []
     
     async def trigger_alert(self, alert_id: int, current_price: float) -> bool:
         """Mark alert as triggered."""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self._write() as db:
                 await db.execute("""
                     UPDATE alerts 
-                    SET is_triggered = 1, current_price = ?, triggered_at = CURRENT_TIMESTAMP
+                    SET is_triggered = 1, current_price = ?, triggered_at = ?
                     WHERE id = ?
-                """, (current_price, alert_id))
+                """, (current_price, int(time.time()), alert_id))
                 await db.commit()
+                self.clear_stats_cache()
                 return True
         except Exception as e:
-            logger.error(f"Error triggering alert {alert_id}: {e}")
+            logger.error("Error triggering alert %s: %s", alert_id, e)
             return False
     
     async def remove_alert(self, alert_id: int, user_id: int = None) -> bool:
         """Remove alert."""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self._write() as db:
                 query = "DELETE FROM alerts WHERE id = ?"
                 params = [alert_id]
                 
@@ -359,58 +833,100 @@ class DatabaseManager:
                 
                 await db.execute(query, params)
                 await db.commit()
+                self.clear_stats_cache()
+                self._watchlist_changed()
                 return True
         except Exception as e:
-            logger.error(f"Error removing alert {alert_id}: {e}")
+            logger.error("Error removing alert %s: %s", alert_id, e)
             return False
     
+    async def remove_alerts(self, alert_ids: List[int], user_id: int) -> int:
+        """Remove many of a user's alerts in one transaction; returns rows deleted."""
+        if not alert_ids:
+            return 0
+        try:
+            deleted = 0
+            async with self._write() as db:
+                for i in range(0, len(alert_ids), SQL_MAX_IN_PARAMS):
+                    chunk = alert_ids[i:i + SQL_MAX_IN_PARAMS]
+                    placeholders = ",".join("?" * len(chunk))
+                    cursor = await db.execute(
+                        f"DELETE FROM alerts WHERE user_id = ? AND id IN ({placeholders})",
+                        [user_id] + chunk
+                    )
+                    deleted += cursor.rowcount
+                await db.commit()
+                self.clear_stats_cache()
+                self._watchlist_changed()
+                return deleted
+        except Exception as e:
+            logger.error("Error removing alerts for user %s: %s", user_id, e)
+            return 0
+
     # Signals history
+    @staticmethod
+    def signal_row(symbol: str, timeframe: str, signal_type: str,
+                   price: float, **technical_data) -> tuple:
+        """Build signals_history row tuple in INSERT_SIGNAL_SQL column order."""
+        return (
+            symbol, timeframe, signal_type, price,
+            technical_data.get('rsi'), technical_data.get('macd'),
+            technical_data.get('macd_signal'), technical_data.get('ma_short'),
+            technical_data.get('ma_long'), technical_data.get('bb_upper'),
+            technical_data.get('bb_lower'), technical_data.get('volume'),
+            technical_data.get('strength', 3), technical_data.get('take_profit'),
+            technical_data.get('stop_loss'), int(time.time())
+        )
+    
     async def add_signal(self, symbol: str, timeframe: str, signal_type: str,
                         price: float, **technical_data) -> Optional[int]:
         """Add signal to history."""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
-                cursor = await db.execute("""
-                    INSERT INTO signals_history 
-                    (symbol, timeframe, signal_type, price, rsi, macd, macd_signal,
-                     ma_short, ma_long, bb_upper, bb_lower, volume, strength, 
-                     take_profit, stop_loss)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    symbol, timeframe, signal_type, price,
-                    technical_data.get('rsi'), technical_data.get('macd'),
-                    technical_data.get('macd_signal'), technical_data.get('ma_short'),
-                    technical_data.get('ma_long'), technical_data.get('bb_upper'),
-                    technical_data.get('bb_lower'), technical_data.get('volume'),
-                    technical_data.get('strength', 3), technical_data.get('take_profit'),
-                    technical_data.get('stop_loss')
-                ))
+            async with self._write() as db:
+                cursor = await db.execute(
+                    INSERT_SIGNAL_SQL,
+                    self.signal_row(symbol, timeframe, signal_type, price, **technical_data)
+                )
                 await db.commit()
+                self.clear_stats_cache()
                 return cursor.lastrowid
         except Exception as e:
-            logger.error(f"Error adding signal: {e}")
+            logger.error("Error adding signal: %s", e)
             return None
     
+    async def add_signals_batch(self, rows: List[tuple]) -> bool:
+        """Insert many signal rows (see signal_row) in one transaction."""
+        if not rows:
+            return True
+        try:
+            async with self._write() as db:
+                await db.executemany(INSERT_SIGNAL_SQL, rows)
+                await db.commit()
+                self.clear_stats_cache()
+                return True
+        except Exception as e:
+            logger.error("Error adding signals batch: %s", e)
+            return False
+    
     async def get_recent_signals(self, symbol: str = None, limit: int = 10) -> List[Dict[str, Any]]:
         """Get recent signals."""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
-                db.row_factory = aiosqlite.Row
-                query = "SELECT * FROM signals_history"
-                params = []
-                
-                if symbol:
-                    query += " WHERE symbol = ?"
-                    params.append(symbol)
+            async with self._read() as db:
+                where = " WHERE symbol = ?" if symbol else ""
+                params = [symbol] if symbol else []
                 
-                query += " ORDER BY created_at DESC LIMIT ?"
-                params.append(limit)
+                # Hot tail first; only touch the archive if it can't fill the limit
+                rows = []
+                for table in ("signals_history", "signals_history_archive"):
+                    query = f"SELECT * FROM {table}{where} ORDER BY created_at DESC LIMIT ?"
+                    async with db.execute(query, params + [limit - len(rows)]) as cursor:
+                        rows.extend(await cursor.fetchall())
+                    if len(rows) >= limit:
+                        break
                 
-                async with db.execute(query, params) as cursor:
-                    rows = await cursor.fetchall()
-                    return [dict(row) for row in rows]
+                return list(map(dict, rows))
         except Exception as e:
-            logger.error(f"Error getting recent signals: {e}")
+            logger.error("Error getting recent signals: %s", e)
             return []
     
     # Broadcasts
@@ -418,31 +934,31 @@ class DatabaseManager:
                            total_users: int = 0) -> Optional[int]:
         """Add broadcast record."""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self._write() as db:
                 cursor = await db.execute("""
-                    INSERT INTO broadcasts (admin_id, message, total_users)
-                    VALUES (?, ?, ?)
-                """, (admin_id, message, total_users))
+                    INSERT INTO broadcasts (admin_id, message, total_users, created_at)
+                    VALUES (?, ?, ?, ?)
+                """, (admin_id, message, total_users, int(time.time())))
                 await db.commit()
                 return cursor.lastrowid
         except Exception as e:
-            logger.error(f"Error adding broadcast: {e}")
+            logger.error("Error adding broadcast: %s", e)
             return None
     
     async def update_broadcast_stats(self, broadcast_id: int, 
                                    successful: int, failed: int) -> bool:
         """Update broadcast statistics."""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self._write() as db:
                 await db.execute("""
                     UPDATE broadcasts 
-                    SET successful_sends = ?, failed_sends = ?, completed_at = CURRENT_TIMESTAMP
+                    SET successful_sends = ?, failed_sends = ?, completed_at = ?
                     WHERE id = ?
-                """, (successful, failed, broadcast_id))
+                """, (successful, failed, int(time.time()), broadcast_id))
                 await db.commit()
                 return True
         except Exception as e:
-            logger.error(f"Error updating broadcast stats: {e}")
+            logger.error("Error updating broadcast stats: %s", e)
             return False
     
     # User interactions
@@ -450,65 +966,123 @@ class DatabaseManager:
                             data: str = None) -> bool:
         """Log user interaction."""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
-                await db.execute("""
-                    INSERT INTO user_interactions (user_id, interaction_type, data)
-                    VALUES (?, ?, ?)
-                """, (user_id, interaction_type, data))
+            async with self._write() as db:
+                await db.execute(INSERT_INTERACTION_SQL, (user_id, interaction_type, data, self._interaction_ts()))
                 await db.commit()
                 return True
         except Exception as e:
-            logger.error(f"Error logging interaction: {e}")
+            logger.error("Error logging interaction: %s", e)
             return False
     
+    async def log_interactions_batch(self, rows: List[tuple]) -> bool:
+        """Insert many (user_id, interaction_type, data, created_at) rows in one transaction."""
+        if not rows:
+            return True
+        try:
+            async with self._write() as db:
+                await db.executemany(INSERT_INTERACTION_SQL, rows)
+                await db.commit()
+                return True
+        except Exception as e:
+            logger.error("Error logging interactions batch: %s", e)
+            return False
+    
+    # Batched background writer
+    def enqueue_signal(self, symbol: str, timeframe: str, signal_type: str,
+                       price: float, **technical_data):
+        """Queue signal row for the next batched flush."""
+        self._pending_signals.append(
+            self.signal_row(symbol, timeframe, signal_type, price, **technical_data)
+        )
+        self._wake_batch_writer()
+    
+    def enqueue_interaction(self, user_id: int, interaction_type: str, data: str = None):
+        """Queue interaction row for the next batched flush."""
+        self._pending_interactions.append((user_id, interaction_type, data, self._interaction_ts()))
+        self._wake_batch_writer()
+    
+    def _wake_batch_writer(self):
+        """Flush early once a batch is full."""
+        if len(self._pending_signals) + len(self._pending_interactions) >= BATCH_MAX_ROWS:
+            self._batch_full.set()
+    
+    async def flush_pending(self):
+        """Write all queued signal and interaction rows."""
+        signals, self._pending_signals = self._pending_signals, []
+        interactions, self._pending_interactions = self._pending_interactions, []
+        await self.add_signals_batch(signals)
+        await self.log_interactions_batch(interactions)
+    
+    async def _batch_writer_loop(self):
+        """Flush queued rows every BATCH_FLUSH_INTERVAL or when BATCH_MAX_ROWS is reached."""
+        while True:
+            try:
+                await asyncio.wait_for(self._batch_full.wait(), timeout=BATCH_FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._batch_full.clear()
+            # Shielded so cancellation on close() doesn't drop in-flight rows;
+            # close() awaits self._batch_flush before closing the connection
+            self._batch_flush = asyncio.ensure_future(self.flush_pending())
+            await asyncio.shield(self._batch_flush)
+    
     # Statistics
     async def get_stats(self) -> Dict[str, Any]:
         """Get bot statistics."""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
-                stats = {}
-                
-                # Users count
-                async with db.execute("SELECT COUNT(*) FROM users") as cursor:
-                    stats['total_users'] = (await cursor.fetchone())[0]
-                
-                async with db.execute("SELECT COUNT(*) FROM users WHERE is_active = 1") as cursor:
-                    stats['active_users'] = (await cursor.fetchone())[0]
-                
-                # Positions count
-                async with db.execute("SELECT COUNT(*) FROM positions") as cursor:
-                    stats['total_positions'] = (await cursor.fetchone())[0]
-                
-                async with db.execute("SELECT COUNT(*) FROM positions WHERE status = 'open'") as cursor:
-                    stats['open_positions'] = (await cursor.fetchone())[0]
-                
-                # Alerts count
-                async with db.execute("SELECT COUNT(*) FROM alerts WHERE is_triggered = 0") as cursor:
-                    stats['active_alerts'] = (await cursor.fetchone())[0]
+            async with self._read() as db:
+                # All counters in a single round-trip
+                async with db.execute("""
+                    SELECT
+                        (SELECT COUNT(*) FROM users),
+                        (SELECT COUNT(*) FROM users WHERE is_active = 1),
+                        (SELECT value FROM stats_counters WHERE name = 'positions'),
+                        (SELECT COUNT(*) FROM positions WHERE status = 'open'),
+                        (SELECT COUNT(*) FROM alerts WHERE is_triggered = 0),
+                        (SELECT value FROM stats_counters WHERE name = 'signals')
+                """) as cursor:
+                    row = await cursor.fetchone()
                 
-                # Signals count
-                async with db.execute("SELECT COUNT(*) FROM signals_history") as cursor:
-                    stats['total_signals'] = (await cursor.fetchone())[0]
+                stats = dict(zip(STATS_KEYS, row))
                 
                 return stats
         except Exception as e:
-            logger.error(f"Error getting stats: {e}")
+            logger.error("Error getting stats: %s", e)
             return {}
 
+    async def get_stats_cached(self, ttl: float = 60) -> Dict[str, Any]:
+        """Get bot statistics, reusing the last result for ttl seconds."""
+        now = time.monotonic()
+        if self._stats_cache is None or now - self._stats_cache_ts > ttl:
+            stats = await self.get_stats()
+            if not stats:
+                return stats
+            self._stats_cache = stats
+            self._stats_cache_ts = now
+        return self._stats_cache
+    
+    def clear_stats_cache(self):
+        """Invalidate cached statistics after writes."""
+        self._stats_cache = None
+    
+    def _watchlist_changed(self):
+        """Tell the position monitor that open positions/active alerts changed."""
+        if self.on_watchlist_change is not None:
+            self.on_watchlist_change()
+
     async def get_all_open_positions(self) -> List[Dict[str, Any]]:
         """Get all open positions for monitoring."""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
-                db.row_factory = aiosqlite.Row
-                async with db.execute("""
-                    SELECT * FROM positions 
+            async with self._read() as db:
+                async with db.execute(f"""
+                    SELECT {MONITOR_POSITION_COLUMNS} FROM positions 
                     WHERE status = 'open'
                     ORDER BY created_at ASC
                 """) as cursor:
                     rows = await cursor.fetchall()
-                    return [dict(row) for row in rows]
+                    return list(map(dict, rows))
         except Exception as e:
-            logger.error(f"Error getting all open positions: {e}")
+            logger.error("Error getting all open positions: %s", e)
             return []
     
     async def get_active_alerts(self) -> List[Dict[str, Any]]:
@@ -0,0 +1,107 @@
+"""
+Admin Notifier Module
+Batch pesan ke admin agar tidak melewati limit Telegram (20 msg/menit per chat)
+"""
+
+import asyncio
+import logging
+from typing import List, Optional
+from telethon.errors import FloodWaitError
+
+logger = logging.getLogger(__name__)
+
+class AdminNotifier:
+    MAX_LEN = 4000  # Telegram limit is 4096 chars, keep some headroom
+    SEND_GAP = 0.05  # seconds between chunks
+    MAX_RETRIES = 3  # FloodWait retries per chunk before leaving it for the next flush
+
+    def __init__(self, client, chat_id: int, flush_interval: float = 3.0):
+        self.client = client
+        self.chat_id = chat_id
+        self.flush_interval = flush_interval
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+        self._unsent: List[str] = []  # chunks built but not yet delivered, oldest first
+
+    def enqueue(self, message: str):
+        """Queue message untuk dikirim pada flush berikutnya"""
+        self._queue.put_nowait(message)
+
+    def start(self):
+        """Start background flusher task"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="admin-notifier")
+
+    async def stop(self):
+        """Stop flusher and send any pending messages"""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    async def _run(self):
+        """Flush pending messages every flush_interval seconds"""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error("Error flushing admin notifications: %s", e)
+
+    async def flush(self):
+        """Join pending messages into as few Telegram messages as possible;
+        a chunk stays buffered until it is sent, so a failed send is retried next flush"""
+        pending = []
+        while not self._queue.empty():
+            pending.append(self._queue.get_nowait().strip())
+
+        if pending:
+            self._unsent.extend(self._build_chunks(pending))
+
+        first = True
+        while self._unsent:
+            if not first:
+                await asyncio.sleep(self.SEND_GAP)
+            first = False
+            await self._send(self._unsent[0])
+            self._unsent.pop(0)
+
+    async def _send(self, chunk: str):
+        """Send one chunk, waiting out FloodWait up to MAX_RETRIES times"""
+        for attempt in range(self.MAX_RETRIES + 1):
+            try:
+                await self.client.send_message(self.chat_id, chunk)
+                return
+            except FloodWaitError as e:
+                if attempt == self.MAX_RETRIES:
+                    raise
+                logger.warning("Admin notification FloodWait, retrying in %ss", e.seconds)
+                await asyncio.sleep(e.seconds)
+
+    def _build_chunks(self, messages: List[str]) -> List[str]:
+        """Pack messages into chunks of at most MAX_LEN chars, splitting on newlines"""
+        lines = "\n\n".join(messages).split("\n")
+        chunks = []
+        current = ""
+
+        for line in lines:
+            # Hard-split single lines longer than MAX_LEN
+            while len(line) > self.MAX_LEN:
+                if current:
+                    chunks.append(current)
+                    current = ""
+                chunks.append(line[:self.MAX_LEN])
+                line = line[self.MAX_LEN:]
+
+            candidate = f"{current}\n{line}" if current else line
+            if len(candidate) > self.MAX_LEN:
+                chunks.append(current)
+                current = line
+            else:
+                current = candidate
+
+        if current:
+            chunks.append(current)
+
+        return chunks
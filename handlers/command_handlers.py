@@ -4,391 +4,517 @@ Handler untuk semua command dan callback Telegram bot
 """
 
 import asyncio
+import bisect
+import functools
 import logging
+import time
+import numpy as np
+from cachetools import LRUCache, TTLCache
 from datetime import datetime
 from typing import Dict, Any, Optional
 from telethon import events, Button
+from telethon.errors import FloodWaitError
 from telethon.tl.types import User
 
 from database import DatabaseManager
-from scripts.tradingview_scraper import TradingViewScraper, TechnicalAnalysis
+from scripts.tradingview_scraper import CACHE_TTL, TradingViewScraper, TechnicalAnalysis
 from keyboards.bot_keyboards import BotKeyboards
-from config import ADMIN_ID, WELCOME_MESSAGE, HELP_MESSAGE
+from handlers.position_monitor import ALERT_SIGNS
+from config import (
+    ADMIN_IDS, WELCOME_MESSAGE, HELP_MESSAGE, COMMAND_RE,
+    SUPPORTED_TIMEFRAMES_SET, ERROR_INVALID_TIMEFRAME
+)
 
 logger = logging.getLogger(__name__)
 
+# Seconds an /admin stats snapshot is reused
+ADMIN_STATS_TTL = 10
+
+# Market data shared between users: at most this many keys, never older than
+# the scraper's price cache so a hit is as fresh as a direct scraper call
+MARKET_DATA_CACHE_SIZE = 1024
+MARKET_DATA_TTL = CACHE_TTL['ticker']
+
+# Interactive sessions kept at most this many / this long (seconds)
+USER_SESSIONS_MAX = 10_000
+USER_SESSION_TTL = 600
+
+# Most recent user_ids remembered as already stored (skips the /start lookup)
+KNOWN_USERS_MAX = 100_000
+
+# Broadcast delivery: concurrent sends in flight, users pulled per batch
+BROADCAST_CONCURRENCY = 20
+BROADCAST_BATCH_SIZE = 500
+# Telegram allows ~30 messages/second per bot; FloodWait retries per recipient
+BROADCAST_RATE = 30
+BROADCAST_MAX_RETRIES = 3
+
+class Session:
+    """Interactive session state per user (fixed fields, no per-entry dict)"""
+    __slots__ = ('state', 'symbol', 'broadcast_id', 'message')
+    
+    def __init__(self, state: str = '', symbol: str = '', broadcast_id: int = 0, message: str = ''):
+        self.state = state
+        self.symbol = symbol
+        self.broadcast_id = broadcast_id
+        self.message = message
+
+def _safe_reply(message: str):
+    """Wrap a handler: log unexpected errors with traceback and reply with message"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(self, event, *args, **kwargs):
+            try:
+                return await fn(self, event, *args, **kwargs)
+            except Exception:
+                logger.exception("Error in %s", fn.__name__)
+                await event.reply(message)
+        return wrapper
+    return decorator
+
+# Emoji lookup tables (bool/tier index instead of per-call if/else ladders)
+_PNL_EMOJI = ("🔴", "🟢")  # indexed by pnl >= 0
+_CONFIDENCE_TIERS = (60, 80)
+_CONFIDENCE_EMOJI = ("📊", "⚡", "🔥")  # indexed by bisect over _CONFIDENCE_TIERS
+_SIGNAL_DISPLAY = {
+    'LONG': ("🟢", "LONG (Buy)"),
+    'SHORT': ("🔴", "SHORT (Sell)"),
+}
+_SIGNAL_DISPLAY_DEFAULT = ("⚪", "NEUTRAL (Hold)")
+
+_clock_cache = (0, "")
+
+def _clock_str() -> str:
+    """Local HH:MM:SS for display, formatted at most once per second"""
+    global _clock_cache
+    now = int(time.time())
+    if _clock_cache[0] != now:
+        _clock_cache = (now, time.strftime('%H:%M:%S', time.localtime(now)))
+    return _clock_cache[1]
+
+# Message templates (static parts built once at import, rows joined per call)
+POSITIONS_HEADER = "📈 **Posisi Trading Aktif**\n\n"
+POSITION_ROW_FMT = """
+**{i}. {symbol} {direction_emoji}**
+• Entry: ${entry_price:,.2f}
+• Current: ${current_price:,.2f}
+• PnL: {pnl_emoji} {pnl_percentage:+.2f}%
+• TP: ${take_profit:,.2f}
+• SL: ${stop_loss:,.2f}
+"""
+POSITIONS_FOOTER_FMT = "\n{pnl_emoji} **Average PnL:** {avg_pnl:+.2f}%"
+
+ALERTS_HEADER = "🔔 **Price Alerts Aktif**\n\n"
+ALERT_ROW_FMT = """
+**{i}. {symbol} {condition_emoji}**
+• Target: ${target_price:,.2f}
+• Condition: {condition}
+• Created: {created_date}
+"""
+
+SETTINGS_TEMPLATE = """
+⚙️ **Bot Settings**
+
+• **Risk per Trade:** 2.0%
+• **Reward Ratio:** 1:2.0
+• **Max Positions:** 5
+• **Notifications:** ✅ Enabled
+• **Default Timeframe:** 1h
+
+User ID: `{user_id}`
+"""
+
+ADMIN_TEMPLATE = """
+🔧 **Admin Panel**
+
+**User Statistics:**
+• Total Users: {total_users}
+• Active Users: {active_users}
+• New Today: {new_today}
+
+**Trading Statistics:**
+• Total Positions: {total_positions}
+• Open Positions: {open_positions}
+
+**System:**
+• Bot Status: ✅ Online
+• Database: ✅ Connected
+• Last Update: {last_update}
+"""
+
+ANALYSIS_TEMPLATE = """
+{direction_emoji} **{symbol} - {direction_text}**
+
+💰 **Price Info:**
+• Current: ${current_price}
+• 24h Change: {change_24h}%
+• Timeframe: {timeframe}
+
+🎯 **Trading Signal:**
+• Entry: ${entry_price}
+• Take Profit: ${take_profit}
+• Stop Loss: ${stop_loss}
+
+{confidence_emoji} **Confidence:** {confidence}%
+📊 **Risk/Reward:** 1:{risk_reward}
+
+**📈 Technical Analysis:**
+"""
+ANALYSIS_ROW_FMT = "• **{indicator}:** {result}\n"
+ANALYSIS_FOOTER_FMT = "\n⏰ *Generated at {time}*"
+
 class CommandHandlers:
-    def __init__(self, client, db: DatabaseManager):
+    def __init__(self, client, db: DatabaseManager, http=None, scraper: Optional[TradingViewScraper] = None):
         self.client = client
         self.db = db
-        self.user_sessions = {}  # Store user interactive sessions
+        self.http = http  # Shared aiohttp session (optional)
+        # Store user interactive sessions; abandoned ones expire on their own
+        self.user_sessions = TTLCache(maxsize=USER_SESSIONS_MAX, ttl=USER_SESSION_TTL)
+        self._known_users = LRUCache(maxsize=KNOWN_USERS_MAX)  # user_id -> True, already in the users table
         self.keyboards = BotKeyboards()
+        # One scraper reused across analyses (keeps its HTTP connection pool and
+        # response caches warm); the bot passes the instance it shares with the monitor
+        self.scraper = scraper or TradingViewScraper(session=http)
+        self._md_cache: TTLCache = TTLCache(maxsize=MARKET_DATA_CACHE_SIZE, ttl=MARKET_DATA_TTL)  # (symbol, timeframe) -> data
+        self._md_inflight: Dict[tuple, asyncio.Task] = {}  # (symbol, timeframe) -> fetch task
+        self._username: Optional[str] = None  # own username (lowercase), resolved on first @mention
+        
+        # Command name -> handler, dispatched from a single NewMessage handler
+        self._cmd_table = {
+            'start': self.handle_start,
+            'help': self.handle_help,
+            'analyze': self.handle_analyze_command,
+            'positions': self.handle_positions,
+            'alerts': self.handle_alerts,
+            'settings': self.handle_settings,
+            'admin': self.handle_admin_command,
+            'broadcast': self.handle_broadcast_command,
+        }
+        
+        # Callback routes: exact payload -> handler(event), prefix -> handler(event, data)
+        self._cb_exact = {
+            b"analyze_market": self.show_symbol_selection,
+            b"input_custom_symbol": self._cb_custom_symbol,
+            b"view_positions": self.handle_positions,
+            b"price_alerts": self.handle_alerts,
+            b"settings": self.handle_settings,
+            b"back_main": self.show_main_menu,
+            b"confirm_broadcast": self.confirm_broadcast,
+            b"cancel_broadcast": self._cb_cancel_broadcast,
+        }
+        self._cb_prefix = (
+            (b"symbol_", self._cb_symbol),
+            (b"tf_", self._cb_timeframe),
+            (b"admin_", self._cb_admin),
+        )
     
     def register_handlers(self):
         """Register semua event handlers"""
         
-        @self.client.on(events.NewMessage(pattern='/start'))
-        async def start_handler(event):
-            await self.handle_start(event)
-        
-        @self.client.on(events.NewMessage(pattern='/help'))
-        async def help_handler(event):
-            await self.handle_help(event)
-        
-        @self.client.on(events.NewMessage(pattern='/analyze'))
-        async def analyze_handler(event):
-            await self.handle_analyze_command(event)
-        
-        @self.client.on(events.NewMessage(pattern='/positions'))
-        async def positions_handler(event):
-            await self.handle_positions(event)
-        
-        @self.client.on(events.NewMessage(pattern='/alerts'))
-        async def alerts_handler(event):
-            await self.handle_alerts(event)
-        
-        @self.client.on(events.NewMessage(pattern='/settings'))
-        async def settings_handler(event):
-            await self.handle_settings(event)
-        
-        @self.client.on(events.NewMessage(pattern='/admin'))
-        async def admin_handler(event):
-            await self.handle_admin_command(event)
-        
-        @self.client.on(events.NewMessage(pattern='/broadcast'))
-        async def broadcast_handler(event):
-            await self.handle_broadcast_command(event)
+        @self.client.on(events.NewMessage(pattern=COMMAND_RE))
+        async def command_handler(event):
+            handler = self._cmd_table.get(event.pattern_match.group(1))
+            if handler:
+                # /cmd@OtherBot in a group is meant for another bot
+                mention = event.pattern_match.group(2)
+                if mention and mention.lower() != await self._bot_username():
+                    return
+                await handler(event)
         
         @self.client.on(events.CallbackQuery)
         async def callback_handler(event):
             await self.handle_callback(event)
         
-        @self.client.on(events.NewMessage)
-        async def message_handler(event):
-            await self.handle_message(event)
+        # Only users in an interactive session reach the coroutine; everyone
+        # else is filtered by a dict lookup before dispatch
+        @self.client.on(events.NewMessage(
+            func=lambda e: e.sender_id in self.user_sessions and not (e.raw_text or '').startswith('/')
+        ))
+        async def session_message_handler(event):
+            await self.handle_interactive_session(event)
     
+    @_safe_reply("❌ Terjadi kesalahan. Silakan coba lagi.")
     async def handle_start(self, event):
         """Handle /start command"""
-        user = await event.get_sender()
-        user_id = user.id
+        user_id = event.sender_id
         
-        try:
-            # Add user to database
-            await self.db.add_user(
-                user_id=user_id,
-                username=getattr(user, 'username', None),
-                first_name=getattr(user, 'first_name', None),
-                last_name=getattr(user, 'last_name', None)
-            )
-            
-            # Log interaction
-            await self.db.log_interaction(user_id, 'start_command')
-            
-            # Send welcome message with keyboard
-            await event.reply(
-                WELCOME_MESSAGE,
-                buttons=self.keyboards.main_menu()
-            )
-            
-        except Exception as e:
-            logger.error(f"Error in start handler: {e}")
-            await event.reply("❌ Terjadi kesalahan. Silakan coba lagi.")
+        if user_id in self._known_users or await self.db.get_user(user_id):
+            # Returning user: no sender fetch, just bump activity and log
+            self._known_users[user_id] = True
+            self.db.enqueue_interaction(user_id, 'start_command')
+            await self.db.update_user_activity(user_id)
+        else:
+            # First /start: fetch sender profile and add user
+            self.db.enqueue_interaction(user_id, 'start_command')
+            user = await event.get_sender()
+            if isinstance(user, User):
+                await self.db.add_user(
+                    user_id=user_id,
+                    username=user.username,
+                    first_name=user.first_name,
+                    last_name=user.last_name
+                )
+            else:
+                await self.db.add_user(user_id=user_id)
+            self._known_users[user_id] = True
+        
+        # Send welcome message with keyboard
+        await event.reply(
+            WELCOME_MESSAGE,
+            buttons=self.keyboards.main_menu()
+        )
     
+    @_safe_reply("❌ Terjadi kesalahan. Silakan coba lagi.")
     async def handle_help(self, event):
         """Handle /help command"""
         user_id = event.sender_id
         
-        try:
-            await self.db.log_interaction(user_id, 'help_command')
-            
-            await event.reply(
-                HELP_MESSAGE,
-                buttons=self.keyboards.help_categories()
-            )
-            
-        except Exception as e:
-            logger.error(f"Error in help handler: {e}")
-            await event.reply("❌ Terjadi kesalahan. Silakan coba lagi.")
+        self.db.enqueue_interaction(user_id, 'help_command')
+        
+        await event.reply(
+            HELP_MESSAGE,
+            buttons=self.keyboards.help_categories()
+        )
     
+    @_safe_reply("❌ Terjadi kesalahan saat analisis.")
     async def handle_analyze_command(self, event):
         """Handle /analyze command dengan parameter opsional"""
         user_id = event.sender_id
         
-        try:
-            # Parse command arguments
-            message_text = event.message.text.strip()
-            parts = message_text.split()
+        # Parse command arguments: /analyze [SYMBOL] [TIMEFRAME]
+        _, _, args = event.message.text.strip().partition(' ')
+        symbol, _, rest = args.strip().partition(' ')
+        
+        if symbol:
+            # Symbol provided directly
+            symbol = symbol.upper()
+            timeframe = rest.strip().partition(' ')[0] or "1h"
             
-            if len(parts) >= 2:
-                # Symbol provided directly
-                symbol = parts[1].upper()
-                timeframe = parts[2] if len(parts) > 2 else "1h"
-                
-                # Add USDT if not present
-                if not symbol.endswith('USDT'):
-                    symbol += 'USDT'
-                
-                await self.perform_analysis(event, symbol, timeframe)
-            else:
-                # Show symbol selection
-                await self.show_symbol_selection(event)
-                
-        except Exception as e:
-            logger.error(f"Error in analyze handler: {e}")
-            await event.reply("❌ Terjadi kesalahan saat analisis.")
+            if timeframe not in SUPPORTED_TIMEFRAMES_SET:
+                await event.reply(ERROR_INVALID_TIMEFRAME)
+                return
+            
+            # Add USDT if not present
+            if not symbol.endswith('USDT'):
+                symbol += 'USDT'
+            
+            await self.perform_analysis(event, symbol, timeframe)
+        else:
+            # Show symbol selection
+            await self.show_symbol_selection(event)
     
+    @_safe_reply("❌ Terjadi kesalahan saat mengambil posisi.")
     async def handle_positions(self, event):
         """Handle /positions command"""
         user_id = event.sender_id
         
-        try:
-            await self.db.log_interaction(user_id, 'view_positions')
-            
-            positions = await self.db.get_user_positions(user_id, status='open')
-            
-            if not positions:
-                await event.reply(
-                    "📈 **Posisi Trading**\n\n"
-                    "Belum ada posisi aktif.\n"
-                    "Gunakan /analyze untuk mendapatkan sinyal trading.",
-                    buttons=[[Button.inline("📊 Analisis Market", b"analyze_market")]]
-                )
-                return
-            
-            # Format positions message
-            msg = "📈 **Posisi Trading Aktif**\n\n"
-            total_pnl = 0
-            
-            for i, pos in enumerate(positions[:5], 1):
-                # Calculate PnL percentage
-                entry_price = pos.get('entry_price', 0)
-                current_price = pos.get('current_price', entry_price)  # Use entry if current not available
-                position_type = pos.get('position_type', 'long').lower()
-                
-                if entry_price > 0:
-                    if position_type == 'long':
-                        pnl_percentage = ((current_price - entry_price) / entry_price) * 100
-                    else:  # short
-                        pnl_percentage = ((entry_price - current_price) / entry_price) * 100
-                else:
-                    pnl_percentage = 0
-                
-                pnl_emoji = "🟢" if pnl_percentage >= 0 else "🔴"
-                direction_emoji = "📈" if position_type == "long" else "📉"
-                
-                msg += f"""
-**{i}. {pos['symbol']} {direction_emoji}**
-• Entry: ${entry_price:,.2f}
-• Current: ${current_price:,.2f}
-• PnL: {pnl_emoji} {pnl_percentage:+.2f}%
-• TP: ${pos.get('take_profit', 0):,.2f}
-• SL: ${pos.get('stop_loss', 0):,.2f}
-"""
-                total_pnl += pnl_percentage
-            
-            # Average PnL
-            avg_pnl = total_pnl / len(positions) if positions else 0
-            pnl_emoji = "🟢" if avg_pnl >= 0 else "🔴"
-            msg += f"\n{pnl_emoji} **Average PnL:** {avg_pnl:+.2f}%"
-            
-            await event.reply(msg, buttons=self.keyboards.position_actions())
-            
-        except Exception as e:
-            logger.error(f"Error in positions handler: {e}")
-            await event.reply("❌ Terjadi kesalahan saat mengambil posisi.")
+        self.db.enqueue_interaction(user_id, 'view_positions')
+        positions = await self.db.get_user_positions(user_id, status='open')
+        
+        if not positions:
+            await event.reply(
+                "📈 **Posisi Trading**\n\n"
+                "Belum ada posisi aktif.\n"
+                "Gunakan /analyze untuk mendapatkan sinyal trading.",
+                buttons=[[Button.inline("📊 Analisis Market", b"analyze_market")]]
+            )
+            return
+        
+        # PnL percentage for every open position in one vectorized pass
+        entry = np.array([pos.get('entry_price') or 0 for pos in positions], dtype=float)
+        # Use entry if current not available
+        current = np.array([pos.get('current_price') or pos.get('entry_price') or 0 for pos in positions], dtype=float)
+        is_long = np.array([(pos.get('position_type') or 'long').lower() == 'long' for pos in positions])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            pnl_pct = np.where(
+                entry > 0,
+                np.where(is_long, current - entry, entry - current) / entry * 100,
+                0.0
+            )
+        
+        # Format positions message (first 5 only)
+        rows = []
+        
+        for i, pos in enumerate(positions[:5], 1):
+            entry_price = entry[i - 1]
+            current_price = current[i - 1]
+            pnl_percentage = pnl_pct[i - 1]
+            position_type = (pos.get('position_type') or 'long').lower()
+            
+            pnl_emoji = _PNL_EMOJI[pnl_percentage >= 0]
+            direction_emoji = "📈" if position_type == "long" else "📉"
+            
+            rows.append(POSITION_ROW_FMT.format(
+                i=i,
+                symbol=pos['symbol'],
+                direction_emoji=direction_emoji,
+                entry_price=entry_price,
+                current_price=current_price,
+                pnl_emoji=pnl_emoji,
+                pnl_percentage=pnl_percentage,
+                take_profit=pos.get('take_profit', 0),
+                stop_loss=pos.get('stop_loss', 0)
+            ))
+        
+        # Average PnL across all open positions, not just the ones shown
+        avg_pnl = float(pnl_pct.mean())
+        pnl_emoji = _PNL_EMOJI[avg_pnl >= 0]
+        msg = POSITIONS_HEADER + "".join(rows) + POSITIONS_FOOTER_FMT.format(
+            pnl_emoji=pnl_emoji, avg_pnl=avg_pnl
+        )
+        
+        await event.reply(msg, buttons=self.keyboards.position_actions())
     
+    @_safe_reply("❌ Terjadi kesalahan saat mengambil alerts.")
     async def handle_alerts(self, event):
         """Handle /alerts command"""
         user_id = event.sender_id
         
-        try:
-            await self.db.log_interaction(user_id, 'view_alerts')
-            
-            # Get user's active alerts from database
-            alerts = await self.db.get_user_alerts(user_id, active_only=True)
-            
-            if not alerts:
-                await event.reply(
-                    "🔔 **Price Alerts**\n\n"
-                    "Belum ada alert aktif.\n\n"
-                    "**Cara membuat alert:**\n"
-                    "1. Pilih 'Add Alert'\n"
-                    "2. Pilih symbol\n"
-                    "3. Set target price\n"
-                    "4. Pilih kondisi (Above/Below)",
-                    buttons=self.keyboards.alert_actions()
-                )
-                return
-            
-            # Format alerts message
-            msg = "🔔 **Price Alerts Aktif**\n\n"
-            
-            for i, alert in enumerate(alerts[:5], 1):
-                condition_emoji = "⬆️" if alert['condition'] == 'ABOVE' else "⬇️"
-                created_date = alert['created_at'][:10] if alert['created_at'] else 'Unknown'
-                
-                msg += f"""
-**{i}. {alert['symbol']} {condition_emoji}**
-• Target: ${alert['target_price']:,.2f}
-• Condition: {alert['condition']}
-• Created: {created_date}
-"""
-            
-            await event.reply(msg, buttons=self.keyboards.alert_actions())
-            
-        except Exception as e:
-            logger.error(f"Error in alerts handler: {e}")
-            await event.reply("❌ Terjadi kesalahan saat mengambil alerts.")
+        # Interaction is batched by the DB writer; only the alerts read is awaited
+        self.db.enqueue_interaction(user_id, 'view_alerts')
+        alerts = await self.db.get_user_alerts(user_id, active_only=True)
+        
+        if not alerts:
+            await event.reply(
+                "🔔 **Price Alerts**\n\n"
+                "Belum ada alert aktif.\n\n"
+                "**Cara membuat alert:**\n"
+                "1. Pilih 'Add Alert'\n"
+                "2. Pilih symbol\n"
+                "3. Set target price\n"
+                "4. Pilih kondisi (Above/Below)",
+                buttons=self.keyboards.alert_actions()
+            )
+            return
+        
+        # Format alerts message
+        rows = []
+        
+        for i, alert in enumerate(alerts[:5], 1):
+            condition = 'ABOVE' if ALERT_SIGNS.get(alert['alert_type']) == 1 else 'BELOW'
+            condition_emoji = "⬆️" if condition == 'ABOVE' else "⬇️"
+            created_date = datetime.fromtimestamp(alert['created_at']).strftime('%Y-%m-%d') if alert['created_at'] else 'Unknown'
+            
+            rows.append(ALERT_ROW_FMT.format(
+                i=i,
+                symbol=alert['symbol'],
+                condition_emoji=condition_emoji,
+                target_price=alert['target_price'],
+                condition=condition,
+                created_date=created_date
+            ))
+        
+        msg = ALERTS_HEADER + "".join(rows)
+        
+        await event.reply(msg, buttons=self.keyboards.alert_actions())
     
+    @_safe_reply("❌ Terjadi kesalahan saat mengambil settings.")
     async def handle_settings(self, event):
         """Handle /settings command"""
         user_id = event.sender_id
         
-        try:
-            await self.db.log_interaction(user_id, 'view_settings')
-            
-            # Default settings (bisa diperluas dengan user preferences)
-            msg = f"""
-⚙️ **Bot Settings**
-
-• **Risk per Trade:** 2.0%
-• **Reward Ratio:** 1:2.0
-• **Max Positions:** 5
-• **Notifications:** ✅ Enabled
-• **Default Timeframe:** 1h
-
-User ID: `{user_id}`
-"""
-            
-            await event.reply(msg, buttons=self.keyboards.settings_menu())
-            
-        except Exception as e:
-            logger.error(f"Error in settings handler: {e}")
-            await event.reply("❌ Terjadi kesalahan saat mengambil settings.")
+        # Default settings (bisa diperluas dengan user preferences)
+        msg = SETTINGS_TEMPLATE.format(user_id=user_id)
+        
+        self.db.enqueue_interaction(user_id, 'view_settings')
+        await event.reply(msg, buttons=self.keyboards.settings_menu())
     
+    @_safe_reply("❌ Terjadi kesalahan admin.")
     async def handle_admin_command(self, event):
         """Handle /admin command (admin only)"""
         user_id = event.sender_id
         
-        if user_id != ADMIN_ID:
+        if user_id not in ADMIN_IDS:
             await event.reply("❌ Access denied. Admin only.")
             return
         
-        try:
-            # Get bot statistics
-            stats = await self.db.get_stats()
-            
-            msg = f"""
-🔧 **Admin Panel**
-
-**User Statistics:**
-• Total Users: {stats.get('total_users', 0)}
-• Active Users: {stats.get('active_users', 0)}
-• New Today: {stats.get('new_today', 0)}
-
-**Trading Statistics:**
-• Total Positions: {stats.get('total_positions', 0)}
-• Open Positions: {stats.get('open_positions', 0)}
-
-**System:**
-• Bot Status: ✅ Online
-• Database: ✅ Connected
-• Last Update: {datetime.now().strftime('%H:%M:%S')}
-"""
-            
-            await event.reply(msg, buttons=self.keyboards.admin_panel())
-            
-        except Exception as e:
-            logger.error(f"Error in admin handler: {e}")
-            await event.reply("❌ Terjadi kesalahan admin.")
+        # Get bot statistics (short TTL; admin tends to refresh the panel)
+        stats = await self.db.get_stats_cached(ttl=ADMIN_STATS_TTL)
+        
+        msg = ADMIN_TEMPLATE.format(
+            total_users=stats.get('total_users', 0),
+            active_users=stats.get('active_users', 0),
+            new_today=stats.get('new_today', 0),
+            total_positions=stats.get('total_positions', 0),
+            open_positions=stats.get('open_positions', 0),
+            last_update=_clock_str()
+        )
+        
+        await event.reply(msg, buttons=self.keyboards.admin_panel())
     
+    @_safe_reply("❌ Terjadi kesalahan broadcast.")
     async def handle_broadcast_command(self, event):
         """Handle /broadcast command (admin only)"""
         user_id = event.sender_id
         
-        if user_id != ADMIN_ID:
+        if user_id not in ADMIN_IDS:
             await event.reply("❌ Access denied. Admin only.")
             return
         
-        try:
-            # Parse broadcast message
-            message_text = event.message.text
-            if message_text.startswith('/broadcast '):
-                broadcast_msg = message_text[11:]  # Remove '/broadcast '
-                
-                if broadcast_msg.strip():
-                    await self.send_broadcast(event, broadcast_msg)
-                else:
-                    await event.reply("❌ Broadcast message cannot be empty.\nUsage: /broadcast <message>")
+        # Parse broadcast message
+        _, sep, broadcast_msg = event.message.text.partition(' ')  # Drop '/broadcast[@bot] '
+        if sep:
+            if broadcast_msg.strip():
+                await self.send_broadcast(event, broadcast_msg)
             else:
-                await event.reply(
-                    "📢 **Broadcast Message**\n\n"
-                    "Usage: `/broadcast <your message>`\n\n"
-                    "Example: `/broadcast 🚀 New feature available!`"
-                )
-                
-        except Exception as e:
-            logger.error(f"Error in broadcast handler: {e}")
-            await event.reply("❌ Terjadi kesalahan broadcast.")
+                await event.reply("❌ Broadcast message cannot be empty.\nUsage: /broadcast <message>")
+        else:
+            await event.reply(
+                "📢 **Broadcast Message**\n\n"
+                "Usage: `/broadcast <your message>`\n\n"
+                "Example: `/broadcast 🚀 New feature available!`"
+            )
     
     async def handle_callback(self, event):
         """Handle inline keyboard callbacks"""
         user_id = event.sender_id
-        data = event.data.decode('utf-8')
+        data = event.data  # raw bytes; routing compares bytes, suffixes decoded on demand
+
+        # Reject non-admin admin_* callbacks before any DB write
+        if data.startswith(b"admin_") and user_id not in ADMIN_IDS:
+            await event.answer("❌ Access denied.", alert=True)
+            return
 
         try:
             # Log callback interaction
-            await self.db.log_interaction(user_id, 'callback', data)
-
-            # Route callback to appropriate handler
-            if data == "analyze_market":
-                await self.show_symbol_selection(event)
-
-            elif data == "input_custom_symbol":
-                # Set user session state to wait for custom symbol input
-                self.user_sessions[user_id] = {'state': 'waiting_custom_symbol'}
-                await event.respond("✏️ Silakan ketik symbol yang ingin dianalisis (contoh: DOGEUSDT):")
+            self.db.enqueue_interaction(user_id, 'callback', data.decode('utf-8', 'replace'))
 
-            elif data.startswith("symbol_"):
-                symbol = data[7:]  # Remove "symbol_" prefix
-                await self.show_timeframe_selection(event, symbol)
-
-            elif data.startswith("tf_"):
-                timeframe = data[3:]  # Remove "tf_" prefix
-                await self.handle_timeframe_selection(event, timeframe)
-
-            elif data == "view_positions":
-                await self.handle_positions(event)
-
-            elif data == "price_alerts":
-                await self.handle_alerts(event)
-
-            elif data == "settings":
-                await self.handle_settings(event)
-
-            elif data == "back_main":
-                await self.show_main_menu(event)
-
-            elif data.startswith("admin_"):
-                await self.handle_admin_callback(event, data)
+            # Route callback: exact matches by dict lookup, then the few prefix routes
+            handler = self._cb_exact.get(data)
+            if handler:
+                await handler(event)
+                return
 
-            # Add more callback handlers as needed...
+            for prefix, handler in self._cb_prefix:
+                if data.startswith(prefix):
+                    await handler(event, data)
+                    break
 
-        except Exception as e:
-            logger.error(f"Error in callback handler: {e}")
+        except Exception:
+            logger.exception("Error in callback handler")
             await event.edit("❌ Terjadi kesalahan. Silakan coba lagi.")
     
-    async def handle_message(self, event):
-        """Handle regular text messages (for interactive sessions)"""
-        user_id = event.sender_id
-        
-        # Skip if message is a command
-        if event.message.text.startswith('/'):
-            return
-        
-        # Handle interactive sessions
-        if user_id in self.user_sessions:
-            await self.handle_interactive_session(event)
+    async def _cb_custom_symbol(self, event):
+        """Set user session state to wait for custom symbol input"""
+        self.user_sessions[event.sender_id] = Session(state='waiting_custom_symbol')
+        await event.respond("✏️ Silakan ketik symbol yang ingin dianalisis (contoh: DOGEUSDT):")
+    
+    async def _cb_cancel_broadcast(self, event):
+        """Drop the pending broadcast"""
+        self.user_sessions.pop(event.sender_id, None)
+        await event.edit("❌ Broadcast cancelled.")
+    
+    async def _cb_symbol(self, event, data: bytes):
+        """symbol_<SYMBOL> callback"""
+        await self.show_timeframe_selection(event, data[7:].decode())
+    
+    async def _cb_timeframe(self, event, data: bytes):
+        """tf_<TIMEFRAME> callback"""
+        await self.handle_timeframe_selection(event, data[3:].decode())
+    
+    async def _cb_admin(self, event, data: bytes):
+        """admin_* callbacks"""
+        await self.handle_admin_callback(event, data.decode())
     
     async def show_symbol_selection(self, event):
         """Show symbol selection keyboard"""
@@ -396,13 +522,13 @@ User ID: `{user_id}`
         try:
             await event.edit(msg, buttons=self.keyboards.symbol_selection())
         except Exception as e:
-            logger.warning(f"event.edit failed in show_symbol_selection, fallback to reply: {e}")
+            logger.warning("event.edit failed in show_symbol_selection, fallback to reply: %s", e)
             await event.reply(msg, buttons=self.keyboards.symbol_selection())
     
     async def show_timeframe_selection(self, event, symbol: str, as_reply: bool = False):
         """Show timeframe selection for chosen symbol"""
         # Store symbol in user session
-        self.user_sessions[event.sender_id] = {'symbol': symbol}
+        self.user_sessions[event.sender_id] = Session(symbol=symbol)
 
         msg = f"📊 **{symbol}**\n\n⏰ Pilih timeframe untuk analisis:"
         if as_reply:
@@ -414,54 +540,106 @@ User ID: `{user_id}`
         """Handle timeframe selection and perform analysis"""
         user_id = event.sender_id
         
-        if user_id not in self.user_sessions:
+        # Single pop: consumes the session and avoids a second lookup/race on cleanup
+        session = self.user_sessions.pop(user_id, None)
+        if session is None:
             await event.edit("❌ Session expired. Please start again.")
             return
         
-        symbol = self.user_sessions[user_id].get('symbol')
+        symbol = session.symbol
         if not symbol:
             await event.edit("❌ Symbol not found. Please start again.")
             return
         
-        # Clean up session
-        del self.user_sessions[user_id]
-        
         await self.perform_analysis(event, symbol, timeframe)
     
+    async def _bot_username(self) -> str:
+        """Own username in lowercase (get_me once, after the client has started)"""
+        if self._username is None:
+            me = await self.client.get_me()
+            self._username = (me.username or '').lower()
+        return self._username
+    
+    async def _get_scraper(self) -> TradingViewScraper:
+        """Return the shared scraper, opening its own session on first use if none was given"""
+        if self.scraper.session is None:
+            await self.scraper.__aenter__()
+        return self.scraper
+    
+    async def get_market_data(self, symbol: str, timeframe: str) -> Optional[Dict[str, Any]]:
+        """Market data shared across users for MARKET_DATA_TTL; one fetch per key on a miss"""
+        data = self._peek_market_data(symbol, timeframe)
+        if data is not None:
+            return data
+        
+        key = (symbol, timeframe)
+        # Single-flight: concurrent callers share one fetch (and its failure);
+        # shielded so a cancelled caller doesn't abort it for the others
+        task = self._md_inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._fetch_market_data(symbol, timeframe))
+            self._md_inflight[key] = task
+            task.add_done_callback(lambda _: self._md_inflight.pop(key, None))
+        return await asyncio.shield(task)
+    
+    def _peek_market_data(self, symbol: str, timeframe: str) -> Optional[Dict[str, Any]]:
+        """Cached market data if still fresh, else None (never fetches)"""
+        return self._md_cache.get((symbol, timeframe))
+    
+    async def _fetch_market_data(self, symbol: str, timeframe: str) -> Optional[Dict[str, Any]]:
+        """Fetch market data from the scraper and store it in the shared cache"""
+        scraper = await self._get_scraper()
+        data = await scraper.get_market_data(symbol, timeframe)
+        if data:
+            self._md_cache[(symbol, timeframe)] = data
+        return data
+    
+    async def close(self):
+        """Release the scraper session (no-op when the session is shared)"""
+        await self.scraper.__aexit__(None, None, None)
+    
     async def perform_analysis(self, event, symbol: str, timeframe: str):
         """Perform market analysis for symbol and timeframe"""
         try:
-            # Show loading message
-            loading_msg = await event.edit(f"🔄 Menganalisis {symbol} ({timeframe})...")
-
-            # Perform analysis using TradingView scraper
-            async with TradingViewScraper() as scraper:
-                data = await scraper.get_market_data(symbol, timeframe)
-
-                # Jika data None atau kosong, JANGAN lanjut analisis, tampilkan error ke user
-                if not data or not isinstance(data, dict) or not data.get('price'):
-                    await loading_msg.edit(
-                        f"❌ **Data Tidak Ditemukan**\n\n"
-                        f"Tidak dapat mengambil data untuk {symbol}.\n"
-                        f"Pastikan symbol benar dan tersedia di exchange/API.\n",
-                        buttons=self.keyboards.symbol_selection()
-                    )
-                    return
+            # Cache hit: edit straight to the result (one API call instead of two)
+            data = self._peek_market_data(symbol, timeframe)
+            if data is not None:
+                loading_msg = event
+            else:
+                # Cache miss: show loading message while the fetch is in flight
+                loading_msg, data = await asyncio.gather(
+                    event.edit(f"🔄 Menganalisis {symbol} ({timeframe})..."),
+                    self.get_market_data(symbol, timeframe)
+                )
 
-                # Calculate trading signal
-                signal = TechnicalAnalysis.calculate_signal_strength(data)
+            # Jika data None atau kosong, JANGAN lanjut analisis, tampilkan error ke user
+            if not data or not isinstance(data, dict) or not data.get('price'):
+                await loading_msg.edit(
+                    f"❌ **Data Tidak Ditemukan**\n\n"
+                    f"Tidak dapat mengambil data untuk {symbol}.\n"
+                    f"Pastikan symbol benar dan tersedia di exchange/API.\n",
+                    buttons=self.keyboards.symbol_selection()
+                )
+                return
 
-                if signal['signal'] == 'ERROR':
-                    await loading_msg.edit(
-                        f"❌ **Analysis Error**\n\n"
-                        f"Error dalam analisis {symbol}.\n"
-                        f"Silakan coba lagi.",
-                        buttons=self.keyboards.symbol_selection()
-                    )
-                    return
+            # Calculate trading signal
+            signal = TechnicalAnalysis.calculate_signal_strength(data)
+
+            if signal['signal'] == 'ERROR':
+                await loading_msg.edit(
+                    f"❌ **Analysis Error**\n\n"
+                    f"Error dalam analisis {symbol}.\n"
+                    f"Silakan coba lagi.",
+                    buttons=self.keyboards.symbol_selection()
+                )
+                return
 
-                # Save signal to database
-                await self.db.add_signal(
+            # Format result message
+            result_msg = self.format_analysis_result(data, signal, symbol, timeframe)
+
+            # Save signal to database and show result with action buttons concurrently
+            await asyncio.gather(
+                self.db.add_signal(
                     symbol=symbol,
                     timeframe=timeframe,
                     signal_type=signal['signal'].lower(),
@@ -469,19 +647,15 @@ User ID: `{user_id}`
                     take_profit=signal['take_profit'],
                     stop_loss=signal['stop_loss'],
                     strength=signal['confidence']
-                )
-
-                # Format result message
-                result_msg = self.format_analysis_result(data, signal, symbol, timeframe)
-
-                # Show result with action buttons
-                await loading_msg.edit(
+                ),
+                loading_msg.edit(
                     result_msg,
                     buttons=self.keyboards.signal_actions(symbol, signal['signal'])
                 )
+            )
 
-        except Exception as e:
-            logger.error(f"Error performing analysis: {e}")
+        except Exception:
+            logger.exception("Error performing analysis")
             await event.edit(
                 "❌ **Analysis Failed**\n\n"
                 "Terjadi kesalahan saat analisis.\n"
@@ -501,23 +675,10 @@ User ID: `{user_id}`
             confidence = signal['confidence']
             
             # Direction emoji and color
-            if direction == 'LONG':
-                direction_emoji = "🟢"
-                direction_text = "LONG (Buy)"
-            elif direction == 'SHORT':
-                direction_emoji = "🔴"
-                direction_text = "SHORT (Sell)"
-            else:
-                direction_emoji = "⚪"
-                direction_text = "NEUTRAL (Hold)"
+            direction_emoji, direction_text = _SIGNAL_DISPLAY.get(direction, _SIGNAL_DISPLAY_DEFAULT)
             
             # Confidence emoji
-            if confidence >= 80:
-                confidence_emoji = "🔥"
-            elif confidence >= 60:
-                confidence_emoji = "⚡"
-            else:
-                confidence_emoji = "📊"
+            confidence_emoji = _CONFIDENCE_EMOJI[bisect.bisect_right(_CONFIDENCE_TIERS, confidence)]
             
             # Entry, TP, SL, and risk/reward as string (no rounding)
             entry_price = str(signal.get('entry_price', ''))
@@ -527,32 +688,30 @@ User ID: `{user_id}`
             # Confidence as string (no rounding)
             confidence_str = str(confidence)
             
-            msg = f"""
-{direction_emoji} **{symbol} - {direction_text}**
-
-💰 **Price Info:**
-• Current: ${current_price}
-• 24h Change: {change_24h}%
-• Timeframe: {timeframe}
-
-🎯 **Trading Signal:**
-• Entry: ${entry_price}
-• Take Profit: ${take_profit}
-• Stop Loss: ${stop_loss}
-
-{confidence_emoji} **Confidence:** {confidence_str}%
-📊 **Risk/Reward:** 1:{risk_reward}
-
-**📈 Technical Analysis:**
-"""
+            header = ANALYSIS_TEMPLATE.format(
+                direction_emoji=direction_emoji,
+                symbol=symbol,
+                direction_text=direction_text,
+                current_price=current_price,
+                change_24h=change_24h,
+                timeframe=timeframe,
+                entry_price=entry_price,
+                take_profit=take_profit,
+                stop_loss=stop_loss,
+                confidence_emoji=confidence_emoji,
+                confidence=confidence_str,
+                risk_reward=risk_reward
+            )
             # Add analysis details
             analysis = signal.get('analysis', {})
-            for indicator, result in analysis.items():
-                msg += f"• **{indicator.upper()}:** {result}\n"
-            msg += f"\n⏰ *Generated at {datetime.now().strftime('%H:%M:%S')}*"
-            return msg
-        except Exception as e:
-            logger.error(f"Error formatting analysis result: {e}")
+            rows = [
+                ANALYSIS_ROW_FMT.format(indicator=indicator.upper(), result=result)
+                for indicator, result in analysis.items()
+            ]
+            footer = ANALYSIS_FOOTER_FMT.format(time=_clock_str())
+            return header + "".join(rows) + footer
+        except Exception:
+            logger.exception("Error formatting analysis result")
             return f"📊 **Analysis for {symbol}**\n\nError formatting result."
     
     async def show_main_menu(self, event):
@@ -573,7 +732,7 @@ User ID: `{user_id}`
         message_text = event.message.text.strip()
 
         # Handle different session types
-        if session.get('state') == 'waiting_custom_symbol':
+        if session.state == 'waiting_custom_symbol':
             symbol = message_text.upper()
 
             # Validate symbol
@@ -586,14 +745,14 @@ User ID: `{user_id}`
                 symbol += 'USDT'
 
             # Update session and show timeframe selection
-            session['symbol'] = symbol
+            session.symbol = symbol
             await self.show_timeframe_selection(event, symbol, as_reply=True)
     
     async def handle_admin_callback(self, event, data: str):
         """Handle admin-specific callbacks"""
         user_id = event.sender_id
         
-        if user_id != ADMIN_ID:
+        if user_id not in ADMIN_IDS:
             await event.answer("❌ Access denied.", alert=True)
             return
         
@@ -605,41 +764,113 @@ User ID: `{user_id}`
             )
             
             # Set admin session for broadcast
-            self.user_sessions[user_id] = {'state': 'waiting_broadcast_message'}
+            self.user_sessions[user_id] = Session(state='waiting_broadcast_message')
     
+    @_safe_reply("❌ Error preparing broadcast.")
     async def send_broadcast(self, event, message: str):
         """Send broadcast message to all users"""
-        try:
-            # Get all active users
-            users = await self.db.get_all_users(active_only=True)
-            
-            if not users:
-                await event.reply("❌ No active users found.")
-                return
-            
-            # Create broadcast record
-            broadcast_id = await self.db.add_broadcast(ADMIN_ID, message, len(users))
-            
-            # Confirm broadcast
-            await event.reply(
-                f"📢 **Confirm Broadcast**\n\n"
-                f"Message: {message}\n\n"
-                f"Will be sent to {len(users)} users.\n"
-                f"Continue?",
-                buttons=self.keyboards.broadcast_confirmation(len(users))
-            )
-            
-            # Store broadcast info in session
-            self.user_sessions[event.sender_id] = {
-                'state': 'confirming_broadcast',
-                'broadcast_id': broadcast_id,
-                'message': message,
-                'users': users
-            }
-            
-        except Exception as e:
-            logger.error(f"Error preparing broadcast: {e}")
-            await event.reply("❌ Error preparing broadcast.")
+        # Count active users; recipients are streamed with iter_all_users on send
+        total_users = await self.db.count_users(active_only=True)
+        
+        if not total_users:
+            await event.reply("❌ No active users found.")
+            return
+        
+        # Create broadcast record
+        broadcast_id = await self.db.add_broadcast(event.sender_id, message, total_users)
+        
+        # Confirm broadcast
+        await event.reply(
+            f"📢 **Confirm Broadcast**\n\n"
+            f"Message: {message}\n\n"
+            f"Will be sent to {total_users} users.\n"
+            f"Continue?",
+            buttons=self.keyboards.broadcast_confirmation(total_users)
+        )
+        
+        # Store broadcast info in session
+        self.user_sessions[event.sender_id] = Session(
+            state='confirming_broadcast',
+            broadcast_id=broadcast_id,
+            message=message
+        )
+    
+    async def confirm_broadcast(self, event):
+        """Deliver the broadcast the admin just confirmed"""
+        user_id = event.sender_id
+        
+        if user_id not in ADMIN_IDS:
+            await event.answer("❌ Access denied.", alert=True)
+            return
+        
+        session = self.user_sessions.pop(user_id, None)
+        if not session or session.state != 'confirming_broadcast':
+            await event.edit("❌ Session expired. Please start again.")
+            return
+        
+        await event.edit("📢 Sending broadcast...")
+        successful, failed = await self.deliver_broadcast(session.message)
+        await self.db.update_broadcast_stats(session.broadcast_id, successful, failed)
+        
+        await event.edit(
+            f"✅ **Broadcast Completed**\n\n"
+            f"• Sent: {successful}\n"
+            f"• Failed: {failed}"
+        )
+    
+    async def deliver_broadcast(self, message: str) -> tuple:
+        """Send message to all active users, paced at BROADCAST_RATE; returns (successful, failed)"""
+        sem = asyncio.Semaphore(BROADCAST_CONCURRENCY)
+        interval = 1.0 / BROADCAST_RATE
+        next_slot = time.monotonic()
+        
+        async def _wait_slot():
+            # Hand out send slots interval apart so the bot-wide rate is never exceeded
+            nonlocal next_slot
+            now = time.monotonic()
+            slot = max(next_slot, now)
+            next_slot = slot + interval
+            if slot > now:
+                await asyncio.sleep(slot - now)
+        
+        async def _send(target_id: int) -> bool:
+            nonlocal next_slot
+            async with sem:
+                for attempt in range(BROADCAST_MAX_RETRIES + 1):
+                    await _wait_slot()
+                    try:
+                        await self.client.send_message(target_id, message)
+                        return True
+                    except FloodWaitError as e:
+                        # Pause every sender, not just this one, for the requested time
+                        if attempt == BROADCAST_MAX_RETRIES:
+                            logger.warning("Broadcast to %s gave up after FloodWait: %s", target_id, e)
+                            return False
+                        next_slot = max(next_slot, time.monotonic() + e.seconds)
+                    except Exception as e:
+                        logger.warning("Broadcast to %s failed: %s", target_id, e)
+                        return False
+        
+        successful = failed = 0
+        batch = []
+        
+        async def _flush():
+            nonlocal successful, failed
+            results = await asyncio.gather(*(_send(target_id) for target_id in batch))
+            sent = sum(results)
+            successful += sent
+            failed += len(results) - sent
+            batch.clear()
+        
+        # Users are paged from the DB; only one batch of ids is held at a time
+        async for user in self.db.iter_all_users(active_only=True):
+            batch.append(user['user_id'])
+            if len(batch) >= BROADCAST_BATCH_SIZE:
+                await _flush()
+        if batch:
+            await _flush()
+        
+        return successful, failed
 
 # Test function
 def test_handlers():
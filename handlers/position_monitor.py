@@ -5,143 +5,347 @@ Monitor posisi trading dan price alerts secara real-time
 
 import asyncio
 import logging
+import time
+import numpy as np
+from collections import defaultdict
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 
 from database import DatabaseManager
 from scripts.tradingview_scraper import TradingViewScraper
+from keyboards.bot_keyboards import display_symbol
 
 logger = logging.getLogger(__name__)
 
+# Max concurrent market-data fetches per batch (tick prefetch, alerts)
+MARKET_FETCH_CONCURRENCY = 8
+
+# Adaptive check interval (seconds): base check_interval scaled by how close the
+# nearest position is to its TP/SL relative to NEAR_LEVEL_DISTANCE, clamped
+CHECK_INTERVAL_MIN = 5
+CHECK_INTERVAL_MAX = 60
+NEAR_LEVEL_DISTANCE = 0.02  # 2% of price
+ALERT_CHECK_INTERVAL = 60  # used when only alerts are being watched
+
+# Cached open positions/alerts are reloaded after invalidate() (the database
+# calls wake() on adds/removals) or at this age (seconds), which bounds how long
+# rows written by another process go unseen; also the idle wait
+WATCHLIST_MAX_AGE = 30.0
+
+# Seconds shutdown waits for queued user notifications to be sent
+NOTIFY_DRAIN_TIMEOUT = 10.0
+
+# alerts.alert_type -> direction sign: hit when sign * (price - target) >= 0
+ALERT_SIGNS = {'price_above': 1, 'price_below': -1}
+
+# Notification templates (parsed once; only the variable fields are formatted)
+POSITION_CLOSED_TEMPLATE = """
+{emoji} **{title}**
+
+{direction_emoji} **{symbol} {direction} Position Closed**
+
+💰 **Trade Summary:**
+• Entry Price: ${entry_price:,.2f}
+• Exit Price: ${current_price:,.2f}
+• Result: **{result}**
+
+{pnl_emoji} **PnL: {pnl_percentage:+.2f}%**
+
+⏰ *Closed at {time}*
+"""
+PRICE_ALERT_TEMPLATE = """
+🔔 **PRICE ALERT TRIGGERED!**
+
+{condition_emoji} **{symbol}** telah {condition_text} target price!
+
+🎯 **Alert Details:**
+• Target: ${target_price:,.2f}
+• Current: ${current_price:,.2f}
+• Condition: {condition}
+
+⏰ *Triggered at {time}*
+
+Gunakan /analyze {base_symbol} untuk analisis lanjutan.
+"""
+
 class PositionMonitor:
-    def __init__(self, client, db: DatabaseManager):
+    def __init__(self, client, db: DatabaseManager, http=None, scraper: Optional[TradingViewScraper] = None):
         self.client = client
         self.db = db
+        self.http = http  # Shared aiohttp session (optional)
+        self.shared_scraper = scraper  # Shared scraper (optional; its caches serve handlers too)
         self.is_monitoring = False
-        self.check_interval = 30  # seconds
+        self.check_interval = 30  # seconds (base for the adaptive interval)
+        self._min_level_distance = float('inf')  # nearest TP/SL distance this tick, fraction of price
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._workers: List[asyncio.Task] = []
+        self._symbol_locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+        self._scraper: Optional[TradingViewScraper] = None
+        self._md_cache: Dict[str, Dict] = {}  # symbol -> 1m market data for the current tick
+        self._pending_updates: List[tuple] = []  # (current_price, pnl, position_id) for this tick
+        self._pending_closes: List[tuple] = []  # (position, current_price, status) for this tick
+        self._notify_q: asyncio.Queue = asyncio.Queue()  # (user_id, message) sent by _notification_worker
+        self._notify_task: Optional[asyncio.Task] = None
+        # Open positions / active alerts kept between ticks until invalidated
+        self._positions_cache: Optional[List[Dict]] = None
+        self._alerts_cache: Optional[List[Dict]] = None
+        self._watchlist_loaded_at = 0.0
+        self._wakeup = asyncio.Event()  # set when a position/alert is added or on stop
+        # Timestamp taken once per monitoring tick, shared by closes and notifications
+        self._tick_ts = 0
+        self._tick_hms = ''
     
-    async def start_monitoring(self):
+    async def start_monitoring(self, num_workers: int = 8):
         """Start monitoring positions and alerts"""
         self.is_monitoring = True
-        logger.info("🔄 Starting position monitoring...")
+        logger.info("🔄 Starting position monitoring with %s workers...", num_workers)
+        
+        # Worker pool: each symbol is checked independently so one slow fetch
+        # doesn't block the other symbols
+        self._workers = [
+            asyncio.create_task(self.worker(), name=f"position-worker-{i}")
+            for i in range(num_workers)
+        ]
+        # Telegram sends run on their own task so checks never wait on them
+        self._notify_task = asyncio.create_task(self._notification_worker(), name="position-notifier")
         
-        while self.is_monitoring:
-            try:
-                # Check positions for TP/SL hits
-                await self.check_positions()
-                
-                # Check price alerts
-                await self.check_price_alerts()
-                
-                # Wait before next check
-                await asyncio.sleep(self.check_interval)
-                
-            except Exception as e:
-                logger.error(f"Error in monitoring loop: {e}")
-                await asyncio.sleep(self.check_interval)
-    
-    def stop_monitoring(self):
-        """Stop position monitoring"""
-        self.is_monitoring = False
-        logger.info("⏹️ Position monitoring stopped")
-    
-    async def check_positions(self):
-        """Check all open positions for TP/SL hits"""
         try:
-            # Get all open positions
-            positions = await self.db.get_all_open_positions()
-            
-            if not positions:
-                return
-            
-            # Group positions by symbol to minimize API calls
-            symbols_to_check = list(set(pos['symbol'] for pos in positions))
-            
-            async with TradingViewScraper() as scraper:
-                for symbol in symbols_to_check:
+            # One scraper shared by positions and alerts for the monitor's lifetime
+            # (exiting never closes a session the scraper was given)
+            async with (self.shared_scraper or TradingViewScraper(session=self.http)) as scraper:
+                self._scraper = scraper
+                while self.is_monitoring:
                     try:
-                        # Get current market data
-                        data = await scraper.get_market_data(symbol, '1m')
+                        self._start_tick()
                         
-                        if not data:
-                            continue
+                        # Open positions and active alerts (cached until invalidated)
+                        positions, alerts = await self._load_watchlist()
                         
-                        current_price = data['price']['current']
+                        # Fetch each symbol once for both checks: the union of position
+                        # and alert symbols is prefetched into the market data cache
+                        symbols = {pos['symbol'] for pos in positions} | {alert['symbol'] for alert in alerts}
+                        await self.fetch_market_data(list(symbols))
                         
-                        # Check all positions for this symbol
-                        symbol_positions = [pos for pos in positions if pos['symbol'] == symbol]
+                        # Check positions for TP/SL hits
+                        has_positions = await self.check_positions(positions)
                         
-                        for position in symbol_positions:
-                            await self.check_position_levels(position, current_price)
+                        # Check price alerts
+                        has_alerts = await self.check_price_alerts(alerts)
                         
-                        # Small delay between symbols
-                        await asyncio.sleep(1)
+                        # Nothing to watch: sleep until something is added;
+                        # otherwise wait the adaptive interval (or until woken early)
+                        await self._wait_for_work(
+                            idle=not (has_positions or has_alerts),
+                            timeout=self._next_interval(has_positions)
+                        )
                         
                     except Exception as e:
-                        logger.error(f"Error checking symbol {symbol}: {e}")
-                        continue
-                        
+                        logger.error("Error in monitoring loop: %s", e)
+                        await self._wait_for_work(idle=False, timeout=self.check_interval)
+        finally:
+            self._scraper = None
+            # The loop has exited, so nothing enqueues notifications any more;
+            # stop the check workers, then let queued TP/SL and alert messages go out
+            for task in self._workers:
+                task.cancel()
+            await asyncio.gather(*self._workers, return_exceptions=True)
+            self._workers = []
+            try:
+                await asyncio.wait_for(self._notify_q.join(), timeout=NOTIFY_DRAIN_TIMEOUT)
+            except asyncio.TimeoutError:
+                logger.warning("Discarding %s unsent notifications on shutdown", self._notify_q.qsize())
+            self._notify_task.cancel()
+            await asyncio.gather(self._notify_task, return_exceptions=True)
+            self._notify_task = None
+    
+    def stop_monitoring(self):
+        """Stop position monitoring"""
+        self.is_monitoring = False
+        self._wakeup.set()
+        logger.info("⏹️ Position monitoring stopped")
+    
+    def wake(self):
+        """Reload positions/alerts and run the next check now (call after adding or closing one)"""
+        self.invalidate()
+        self._wakeup.set()
+    
+    def invalidate(self):
+        """Drop cached positions/alerts so the next tick reloads them from the DB"""
+        self._positions_cache = None
+        self._alerts_cache = None
+    
+    async def _load_watchlist(self) -> tuple:
+        """Open positions and active alerts, queried concurrently only when the cache is stale"""
+        if (self._positions_cache is None or self._alerts_cache is None
+                or time.monotonic() - self._watchlist_loaded_at > WATCHLIST_MAX_AGE):
+            self._positions_cache, self._alerts_cache = await asyncio.gather(
+                self.db.get_all_open_positions(),
+                self.db.get_active_alerts()
+            )
+            self._watchlist_loaded_at = time.monotonic()
+        return self._positions_cache, self._alerts_cache
+    
+    def _next_interval(self, has_positions: bool) -> float:
+        """Poll faster when a position is near TP/SL, slower when all are far"""
+        if not has_positions:
+            return ALERT_CHECK_INTERVAL
+        scaled = self.check_interval * self._min_level_distance / NEAR_LEVEL_DISTANCE
+        return max(CHECK_INTERVAL_MIN, min(CHECK_INTERVAL_MAX, scaled))
+    
+    async def _wait_for_work(self, idle: bool, timeout: float):
+        """Block until woken or timeout seconds pass (WATCHLIST_MAX_AGE when idle)"""
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=WATCHLIST_MAX_AGE if idle else timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+    
+    async def _notification_worker(self):
+        """Send queued user notifications one at a time"""
+        while True:
+            user_id, message = await self._notify_q.get()
+            try:
+                await self.client.send_message(user_id, message)
+            except Exception:
+                logger.exception("Error sending notification to %s", user_id)
+            finally:
+                self._notify_q.task_done()
+    
+    async def worker(self):
+        """Pull (symbol, positions) items from the queue and check them"""
+        while True:
+            symbol, symbol_positions = await self._queue.get()
+            try:
+                # Per-symbol lock keeps checks for the same symbol in order
+                async with self._symbol_locks[symbol]:
+                    await self.check_symbol_positions(symbol, symbol_positions)
+            except Exception as e:
+                logger.error("Error checking symbol %s: %s", symbol, e)
+            finally:
+                self._queue.task_done()
+    
+    async def get_market_data(self, symbol: str) -> Optional[Dict]:
+        """1m market data, shared by the positions and alerts checks of one tick"""
+        data = self._md_cache.get(symbol)
+        if data is not None:
+            return data
+        
+        data = await self._scraper.get_market_data(symbol, '1m')
+        if data:
+            self._md_cache[symbol] = data
+        return data
+    
+    def _start_tick(self):
+        """Take the tick timestamp used for closed_at and notification times and
+        drop the previous tick's market data, so every tick checks a fresh price"""
+        self._md_cache.clear()
+        self._tick_ts = int(time.time())
+        self._tick_hms = datetime.fromtimestamp(self._tick_ts).strftime('%H:%M:%S')
+    
+    async def fetch_market_data(self, symbols: List[str]) -> List:
+        """Fetch market data for symbols concurrently (bounded); exceptions returned in place"""
+        sem = asyncio.Semaphore(MARKET_FETCH_CONCURRENCY)
+        
+        async def fetch(symbol: str):
+            async with sem:
+                return await self.get_market_data(symbol)
+        
+        return await asyncio.gather(*(fetch(symbol) for symbol in symbols), return_exceptions=True)
+    
+    async def check_symbol_positions(self, symbol: str, symbol_positions: List[Dict]):
+        """Fetch current price for symbol and check its positions"""
+        data = await self.get_market_data(symbol)
+        
+        if not data:
+            return
+        
+        current_price = data['price']['current']
+        
+        try:
+            # Structure-of-arrays view: one vectorized pass gives PnL and the
+            # TP/SL hit masks for every position on this symbol (NULL levels -> NaN, never hit)
+            entry = np.array([pos['entry_price'] for pos in symbol_positions], dtype=float)
+            quantity = np.array([pos['quantity'] for pos in symbol_positions], dtype=float)
+            take_profit = np.array([pos['take_profit'] for pos in symbol_positions], dtype=float)
+            stop_loss = np.array([pos['stop_loss'] for pos in symbol_positions], dtype=float)
+            is_long = np.array([pos['position_type'] == 'long' for pos in symbol_positions])
+            
+            tp_hit = np.where(is_long, current_price >= take_profit, current_price <= take_profit)
+            sl_hit = np.where(is_long, current_price <= stop_loss, current_price >= stop_loss)
+            pnl = np.where(is_long, current_price - entry, entry - current_price) * quantity
         except Exception as e:
-            logger.error(f"Error checking positions: {e}")
+            logger.error("Error checking position levels for %s: %s", symbol, e)
+            return
+        
+        # Positions that hit a level are closed after the tick (TP wins over SL)
+        hit = tp_hit | sl_hit
+        
+        # Track the nearest remaining TP/SL distance for the adaptive interval
+        if current_price and not hit.all():
+            distance = np.fmin(np.abs(current_price - take_profit), np.abs(current_price - stop_loss))[~hit]
+            if not np.isnan(distance).all():
+                self._min_level_distance = min(self._min_level_distance, float(np.nanmin(distance)) / current_price)
+        self._pending_closes.extend(
+            (symbol_positions[i], current_price, 'TP_HIT' if tp_hit[i] else 'SL_HIT')
+            for i in np.flatnonzero(hit)
+        )
+        
+        # Queue current price and PnL update for the rest (flushed per tick)
+        self._pending_updates.extend(
+            (current_price, float(pnl[i]), symbol_positions[i]['id'])
+            for i in np.flatnonzero(~hit)
+        )
     
-    async def check_position_levels(self, position: Dict, current_price: float):
-        """Check if position hit TP or SL levels"""
+    async def check_positions(self, positions: Optional[List[Dict]] = None) -> bool:
+        """Check all open positions for TP/SL hits; returns False when there are none.
+        Runs on start_monitoring()'s worker pool and scraper, so only call it while monitoring"""
+        if not self._workers or self._scraper is None:
+            raise RuntimeError("check_positions() requires start_monitoring() to be running")
+        
         try:
-            position_id = position['id']
-            user_id = position['user_id']
-            symbol = position['symbol']
-            direction = position['direction']
-            entry_price = position['entry_price']
-            take_profit = position['take_profit']
-            stop_loss = position['stop_loss']
+            # Get all open positions (unless preloaded by the monitoring loop)
+            if positions is None:
+                positions = await self.db.get_all_open_positions()
             
-            # Calculate current PnL
-            if direction == 'LONG':
-                pnl_percentage = ((current_price - entry_price) / entry_price) * 100
-                
-                # Check take profit
-                if current_price >= take_profit:
-                    await self.close_position(position, current_price, 'TP_HIT')
-                    return
-                
-                # Check stop loss
-                if current_price <= stop_loss:
-                    await self.close_position(position, current_price, 'SL_HIT')
-                    return
-                    
-            else:  # SHORT
-                pnl_percentage = ((entry_price - current_price) / entry_price) * 100
-                
-                # Check take profit
-                if current_price <= take_profit:
-                    await self.close_position(position, current_price, 'TP_HIT')
-                    return
-                
-                # Check stop loss
-                if current_price >= stop_loss:
-                    await self.close_position(position, current_price, 'SL_HIT')
-                    return
-            
-            # Update current price and PnL if no TP/SL hit
-            pnl_value = (pnl_percentage / 100) * (position['quantity'] * entry_price)
-            
-            await self.db.update_position(
-                position_id,
-                current_price=current_price,
-                pnl=pnl_value,
-                pnl_percentage=pnl_percentage
-            )
+            if not positions:
+                return False
             
+            self._min_level_distance = float('inf')
+            
+            # Group positions by symbol in one pass to minimize API calls
+            grouped: Dict[str, List[Dict]] = defaultdict(list)
+            for pos in positions:
+                grouped[pos['symbol']].append(pos)
+            
+            # Hand each symbol to the worker pool
+            for item in grouped.items():
+                self._queue.put_nowait(item)
+            
+            # Wait until all symbols are checked, then write price/PnL updates at once
+            await self._queue.join()
+            updates, self._pending_updates = self._pending_updates, []
+            await self.db.update_positions_batch(updates)
+            
+            # Persist every TP/SL close concurrently, then queue the user notifications
+            closes, self._pending_closes = self._pending_closes, []
+            if closes:
+                results = await asyncio.gather(*(self.close_position(*close) for close in closes))
+                for close, pnl_percentage in zip(closes, results):
+                    if pnl_percentage is not None:
+                        await self.send_position_notification(*close, pnl_percentage)
+            return True
+                        
         except Exception as e:
-            logger.error(f"Error checking position levels: {e}")
+            logger.error("Error checking positions: %s", e)
+            return True
     
-    async def close_position(self, position: Dict, current_price: float, status: str):
-        """Close position and send notification"""
+    async def close_position(self, position: Dict, current_price: float, status: str) -> Optional[float]:
+        """Close position in the database; returns PnL % (None on failure)"""
         try:
             position_id = position['id']
             user_id = position['user_id']
             symbol = position['symbol']
-            direction = position['direction']
+            direction = position['position_type'].upper()
             entry_price = position['entry_price']
             
             # Calculate final PnL
@@ -152,30 +356,30 @@ class PositionMonitor:
             
             pnl_value = (pnl_percentage / 100) * (position['quantity'] * entry_price)
             
-            # Update position in database
-            await self.db.update_position(
+            # Update position in database (PnL % is only reported, not stored)
+            if not await self.db.update_position(
                 position_id,
                 current_price=current_price,
                 pnl=pnl_value,
-                pnl_percentage=pnl_percentage,
                 status=status,
-                closed_at=datetime.now().isoformat()
-            )
+                closed_at=self._tick_ts
+            ):
+                return None
+            self.invalidate()
             
-            # Send notification to user
-            await self.send_position_notification(position, current_price, status, pnl_percentage)
-            
-            logger.info(f"Position closed: {symbol} {direction} - {status} - PnL: {pnl_percentage:.2f}%")
+            logger.info("Position closed: %s %s - %s - PnL: %.2f%%", symbol, direction, status, pnl_percentage)
+            return pnl_percentage
             
         except Exception as e:
-            logger.error(f"Error closing position: {e}")
+            logger.error("Error closing position: %s", e)
+            return None
     
     async def send_position_notification(self, position: Dict, current_price: float, status: str, pnl_percentage: float):
         """Send notification about position closure"""
         try:
             user_id = position['user_id']
             symbol = position['symbol']
-            direction = position['direction']
+            direction = position['position_type'].upper()
             entry_price = position['entry_price']
             
             # Format notification message
@@ -191,78 +395,78 @@ class PositionMonitor:
             direction_emoji = "📈" if direction == "LONG" else "📉"
             pnl_emoji = "🟢" if pnl_percentage >= 0 else "🔴"
             
-            message = f"""
-{emoji} **{title}**
-
-{direction_emoji} **{symbol} {direction} Position Closed**
-
-💰 **Trade Summary:**
-• Entry Price: ${entry_price:,.2f}
-• Exit Price: ${current_price:,.2f}
-• Result: **{result}**
-
-{pnl_emoji} **PnL: {pnl_percentage:+.2f}%**
-
-⏰ *Closed at {datetime.now().strftime('%H:%M:%S')}*
-"""
+            message = POSITION_CLOSED_TEMPLATE.format(
+                emoji=emoji,
+                title=title,
+                direction_emoji=direction_emoji,
+                symbol=symbol,
+                direction=direction,
+                entry_price=entry_price,
+                current_price=current_price,
+                result=result,
+                pnl_emoji=pnl_emoji,
+                pnl_percentage=pnl_percentage,
+                time=self._tick_hms
+            )
             
-            # Send notification
-            await self.client.send_message(user_id, message)
+            # Queue notification (sent by _notification_worker)
+            self._notify_q.put_nowait((user_id, message))
             
         except Exception as e:
-            logger.error(f"Error sending position notification: {e}")
+            logger.error("Error sending position notification: %s", e)
     
-    async def check_price_alerts(self):
-        """Check all active price alerts"""
+    async def check_price_alerts(self, alerts: Optional[List[Dict]] = None) -> bool:
+        """Check all active price alerts; returns False when there are none"""
         try:
-            # Get all active alerts
-            alerts = await self.db.get_active_alerts()
+            # Get all active alerts (unless preloaded by the monitoring loop)
+            if alerts is None:
+                alerts = await self.db.get_active_alerts()
             
             if not alerts:
-                return
+                return False
             
-            # Group alerts by symbol
-            symbols_to_check = list(set(alert['symbol'] for alert in alerts))
+            # Group alerts by symbol in one pass
+            grouped: Dict[str, List[Dict]] = defaultdict(list)
+            for alert in alerts:
+                grouped[alert['symbol']].append(alert)
+            symbols_to_check = list(grouped)
             
-            async with TradingViewScraper() as scraper:
-                for symbol in symbols_to_check:
-                    try:
-                        # Get current market data
-                        data = await scraper.get_market_data(symbol, '1m')
-                        
-                        if not data:
-                            continue
-                        
-                        current_price = data['price']['current']
-                        
-                        # Check all alerts for this symbol
-                        symbol_alerts = [alert for alert in alerts if alert['symbol'] == symbol]
-                        
-                        for alert in symbol_alerts:
-                            if self.check_alert_condition(alert, current_price):
-                                await self.trigger_price_alert(alert, current_price)
-                        
-                        # Small delay between symbols
-                        await asyncio.sleep(1)
-                        
-                    except Exception as e:
-                        logger.error(f"Error checking alerts for {symbol}: {e}")
+            # Fetch every symbol concurrently (bounded; cache hits after the tick prefetch)
+            results = await self.fetch_market_data(symbols_to_check)
+            
+            for symbol, data in zip(symbols_to_check, results):
+                try:
+                    if isinstance(data, Exception):
+                        raise data
+                    
+                    if not data:
                         continue
+                    
+                    current_price = data['price']['current']
+                    
+                    # Check all alerts for this symbol in one vectorized pass
+                    symbol_alerts = grouped[symbol]
+                    signs = np.array([ALERT_SIGNS.get(alert['alert_type'], 0) for alert in symbol_alerts])
+                    targets = np.array([alert['target_price'] for alert in symbol_alerts], dtype=float)
+                    hits = (signs != 0) & (signs * (current_price - targets) >= 0)
+                    
+                    for i in np.flatnonzero(hits):
+                        await self.trigger_price_alert(symbol_alerts[i], current_price)
+                    
+                except Exception as e:
+                    logger.error("Error checking alerts for %s: %s", symbol, e)
+                    continue
+            
+            return True
                         
         except Exception as e:
-            logger.error(f"Error checking price alerts: {e}")
+            logger.error("Error checking price alerts: %s", e)
+            return True
     
     def check_alert_condition(self, alert: Dict, current_price: float) -> bool:
         """Check if alert condition is met"""
-        target_price = alert['target_price']
-        condition = alert['condition']
-        
-        if condition == 'ABOVE':
-            return current_price >= target_price
-        elif condition == 'BELOW':
-            return current_price <= target_price
-        
-        return False
+        sign = ALERT_SIGNS.get(alert['alert_type'], 0)
+        return sign != 0 and sign * (current_price - alert['target_price']) >= 0
     
     async def trigger_price_alert(self, alert: Dict, current_price: float):
         """Trigger price alert and send notification"""
@@ -271,42 +475,40 @@ class PositionMonitor:
             user_id = alert['user_id']
             symbol = alert['symbol']
             target_price = alert['target_price']
-            condition = alert['condition']
+            condition = 'ABOVE' if ALERT_SIGNS.get(alert['alert_type']) == 1 else 'BELOW'
             
             # Deactivate alert in database
             await self.db.trigger_alert(alert_id, current_price)
+            self.invalidate()
             
             # Format notification message
             condition_emoji = "⬆️" if condition == 'ABOVE' else "⬇️"
             condition_text = "naik ke" if condition == 'ABOVE' else "turun ke"
             
-            message = f"""
-🔔 **PRICE ALERT TRIGGERED!**
-
-{condition_emoji} **{symbol}** telah {condition_text} target price!
-
-🎯 **Alert Details:**
-• Target: ${target_price:,.2f}
-• Current: ${current_price:,.2f}
-• Condition: {condition}
-
-⏰ *Triggered at {datetime.now().strftime('%H:%M:%S')}*
-
-Gunakan /analyze {symbol.replace('USDT', '')} untuk analisis lanjutan.
-"""
+            message = PRICE_ALERT_TEMPLATE.format(
+                condition_emoji=condition_emoji,
+                symbol=symbol,
+                condition_text=condition_text,
+                target_price=target_price,
+                current_price=current_price,
+                condition=condition,
+                time=self._tick_hms,
+                base_symbol=display_symbol(symbol)
+            )
             
-            # Send notification
-            await self.client.send_message(user_id, message)
+            # Queue notification (sent by _notification_worker)
+            self._notify_q.put_nowait((user_id, message))
             
-            logger.info(f"Price alert triggered: {symbol} {condition} ${target_price:,.2f}")
+            logger.info("Price alert triggered: %s %s $%.2f", symbol, condition, target_price)
             
         except Exception as e:
-            logger.error(f"Error triggering price alert: {e}")
+            logger.error("Error triggering price alert: %s", e)
 
 # Position Manager for manual operations
 class PositionManager:
-    def __init__(self, db: DatabaseManager):
+    def __init__(self, db: DatabaseManager, monitor: Optional[PositionMonitor] = None):
         self.db = db
+        self.monitor = monitor  # Woken on new positions so they're checked right away
     
     async def create_position(self, user_id: int, symbol: str, direction: str, 
                             entry_price: float, take_profit: float, stop_loss: float,
@@ -324,51 +526,37 @@ class PositionManager:
                 stop_loss=stop_loss
             )
             
-            logger.info(f"Position created: {symbol} {direction} for user {user_id}")
+            if position_id and self.monitor:
+                self.monitor.wake()
+            
+            logger.info("Position created: %s %s for user %s", symbol, direction, user_id)
             return position_id
             
         except Exception as e:
-            logger.error(f"Error creating position: {e}")
+            logger.error("Error creating position: %s", e)
             return 0
     
     async def close_position_manually(self, position_id: int, current_price: float) -> bool:
         """Manually close a position"""
         try:
-            # Get position details
-            positions = await self.db.get_all_open_positions()
-            position = next((p for p in positions if p['id'] == position_id), None)
+            # Get position details (single-row lookup by primary key)
+            position = await self.db.get_position_by_id(position_id)
             
-            if not position:
+            if not position or position['status'] != 'open':
                 return False
             
-            # Calculate PnL
-            direction = position['direction']
-            entry_price = position['entry_price']
-            
-            if direction == 'LONG':
-                pnl_percentage = ((current_price - entry_price) / entry_price) * 100
-            else:  # SHORT
-                pnl_percentage = ((entry_price - current_price) / entry_price) * 100
-            
-            pnl_value = (pnl_percentage / 100) * (position['quantity'] * entry_price)
-            
-            # Update position
-            success = await self.db.update_position(
-                position_id,
-                current_price=current_price,
-                pnl=pnl_value,
-                pnl_percentage=pnl_percentage,
-                status='CLOSED_MANUAL',
-                closed_at=datetime.now().isoformat()
-            )
+            # PnL is computed from entry price and quantity in the same UPDATE
+            success = await self.db.close_position(position_id, current_price, status='CLOSED_MANUAL')
             
             if success:
-                logger.info(f"Position closed manually: ID {position_id}")
+                if self.monitor:
+                    self.monitor.wake()
+                logger.info("Position closed manually: ID %s", position_id)
             
             return success
             
         except Exception as e:
-            logger.error(f"Error closing position manually: {e}")
+            logger.error("Error closing position manually: %s", e)
             return False
 
 # Test function
@@ -3,12 +3,28 @@ Keyboard Module
 Inline keyboards untuk Telegram bot
 """
 
+from functools import lru_cache
 from telethon import Button
 from typing import List, Dict, Any
 
+@lru_cache(maxsize=2048)
+def _callback_data(prefix: str, value: str) -> bytes:
+    """Encoded '<prefix>_<value>' callback payload (symbol universe is small and fixed)"""
+    return f"{prefix}_{value}".encode()
+
+@lru_cache(maxsize=2048)
+def display_symbol(symbol: str) -> str:
+    """Symbol without the USDT quote suffix, for display (e.g. BTCUSDT -> BTC)"""
+    return symbol.replace('USDT', '')
+
 class BotKeyboards:
+    # Keyboards without parameters are built once and cached; callers must
+    # not mutate the returned lists. Small parameterized keyboards
+    # (signal_actions, position_detail, confirmation, pagination) get a
+    # bounded LRU keyed on their arguments
     
     @staticmethod
+    @lru_cache(maxsize=None)
     def main_menu() -> List[List[Button]]:
         """Main menu keyboard"""
         return [
@@ -27,6 +43,7 @@ class BotKeyboards:
         ]
     
     @staticmethod
+    @lru_cache(maxsize=None)
     def symbol_selection() -> List[List[Button]]:
         """Keyboard untuk pilihan symbol populer"""
         return [
@@ -52,6 +69,7 @@ class BotKeyboards:
         ]
     
     @staticmethod
+    @lru_cache(maxsize=None)
     def timeframe_selection() -> List[List[Button]]:
         """Keyboard untuk pilihan timeframe"""
         return [
@@ -75,6 +93,7 @@ class BotKeyboards:
         ]
     
     @staticmethod
+    @lru_cache(maxsize=512)
     def signal_actions(symbol: str, direction: str) -> List[List[Button]]:
         """Keyboard untuk aksi setelah mendapat sinyal"""
         return [
@@ -93,6 +112,7 @@ class BotKeyboards:
         ]
     
     @staticmethod
+    @lru_cache(maxsize=None)
     def position_actions() -> List[List[Button]]:
         """Keyboard untuk manajemen posisi"""
         return [
@@ -110,6 +130,7 @@ class BotKeyboards:
         ]
     
     @staticmethod
+    @lru_cache(maxsize=512)
     def position_detail(position_id: int) -> List[List[Button]]:
         """Keyboard untuk detail posisi individual"""
         return [
@@ -123,6 +144,7 @@ class BotKeyboards:
         ]
     
     @staticmethod
+    @lru_cache(maxsize=None)
     def alert_actions() -> List[List[Button]]:
         """Keyboard untuk manajemen alerts"""
         return [
@@ -140,6 +162,7 @@ class BotKeyboards:
         ]
     
     @staticmethod
+    @lru_cache(maxsize=None)
     def alert_condition() -> List[List[Button]]:
         """Keyboard untuk kondisi alert"""
         return [
@@ -153,6 +176,7 @@ class BotKeyboards:
         ]
     
     @staticmethod
+    @lru_cache(maxsize=None)
     def settings_menu() -> List[List[Button]]:
         """Keyboard untuk settings"""
         return [
@@ -170,6 +194,7 @@ class BotKeyboards:
         ]
     
     @staticmethod
+    @lru_cache(maxsize=None)
     def risk_percentage_selection() -> List[List[Button]]:
         """Keyboard untuk pilihan risk percentage"""
         return [
@@ -189,6 +214,7 @@ class BotKeyboards:
         ]
     
     @staticmethod
+    @lru_cache(maxsize=512)
     def confirmation(action: str, data: str = "") -> List[List[Button]]:
         """Keyboard konfirmasi untuk aksi penting"""
         return [
@@ -199,6 +225,7 @@ class BotKeyboards:
         ]
     
     @staticmethod
+    @lru_cache(maxsize=None)
     def admin_panel() -> List[List[Button]]:
         """Keyboard khusus admin"""
         return [
@@ -230,6 +257,7 @@ class BotKeyboards:
         ]
     
     @staticmethod
+    @lru_cache(maxsize=None)
     def market_screener_actions() -> List[List[Button]]:
         """Keyboard untuk market screener"""
         return [
@@ -248,6 +276,7 @@ class BotKeyboards:
         ]
     
     @staticmethod
+    @lru_cache(maxsize=512)
     def pagination(current_page: int, total_pages: int, data_type: str) -> List[List[Button]]:
         """Keyboard untuk pagination"""
         buttons = []
@@ -271,6 +300,7 @@ class BotKeyboards:
         return buttons
     
     @staticmethod
+    @lru_cache(maxsize=None)
     def quick_actions() -> List[List[Button]]:
         """Quick action buttons untuk power users"""
         return [
@@ -285,6 +315,7 @@ class BotKeyboards:
         ]
     
     @staticmethod
+    @lru_cache(maxsize=None)
     def help_categories() -> List[List[Button]]:
         """Keyboard untuk kategori bantuan"""
         return [
@@ -310,9 +341,9 @@ class KeyboardUtils:
     
     @staticmethod
     def add_back_button(buttons: List[List[Button]], back_action: str = "back_main") -> List[List[Button]]:
-        """Add back button to existing keyboard"""
-        buttons.append([Button.inline("↩️ Back", back_action.encode())])
-        return buttons
+        """Return a copy of the keyboard with a back button row added
+        (never mutates its argument: cached keyboards are shared)"""
+        return [*buttons, [Button.inline("↩️ Back", back_action.encode())]]
     
     @staticmethod
     def create_dynamic_symbol_keyboard(symbols: List[str], prefix: str = "symbol") -> List[List[Button]]:
@@ -323,9 +354,7 @@ class KeyboardUtils:
         for i in range(0, len(symbols), 3):
             row = []
             for symbol in symbols[i:i+3]:
-                # Extract display name (remove USDT suffix for display)
-                display_name = symbol.replace('USDT', '')
-                row.append(Button.inline(display_name, f"{prefix}_{symbol}".encode()))
+                row.append(Button.inline(display_symbol(symbol), _callback_data(prefix, symbol)))
             buttons.append(row)
         
         # Add back button
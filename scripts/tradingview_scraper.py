@@ -5,51 +5,322 @@ Script untuk mengambil data market dari TradingView dan Binance API
 
 import aiohttp
 import asyncio
+import heapq
 import json
 import logging
-from typing import Dict, List, Optional, Any
-from datetime import datetime, timedelta
-import pandas as pd
-import ssl
+import random
+import time
+from collections import deque
+from typing import Dict, List, NamedTuple, Optional, Any
+from datetime import datetime
+from functools import lru_cache
+import numpy as np
+from cachetools import TTLCache
+
+# orjson decodes large responses (e.g. the all-symbols 24hr ticker) several times
+# faster than the stdlib json module; fall back to json when it isn't installed
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+# TA-Lib's C EMA uses the same SMA seed and 2/(n+1) multiplier as _ema_series,
+# so it is a drop-in for that loop when installed (optional: needs the TA-Lib C library)
+try:
+    import talib
+except ImportError:
+    talib = None
 
 logger = logging.getLogger(__name__)
 
+# Seconds upstream responses are reused, per endpoint (bounded per-endpoint caches)
+CACHE_TTL = {
+    'ticker': 10, 'all_tickers': 10, 'klines': 60, 'coingecko': 10, 'screener': 30, 'indicators': 60
+}
+CACHE_MAXSIZE = 1024
+
+# CoinGecko coin ids for the CoinGecko price fallback
+COINGECKO_IDS = {
+    'BTCUSDT': 'bitcoin',
+    'ETHUSDT': 'ethereum',
+    'BNBUSDT': 'binancecoin',
+    'ADAUSDT': 'cardano',
+    'XRPUSDT': 'ripple',
+    'SOLUSDT': 'solana',
+    'DOTUSDT': 'polkadot',
+    'DOGEUSDT': 'dogecoin',
+    'AVAXUSDT': 'avalanche-2',
+    'MATICUSDT': 'matic-network',
+    'LINKUSDT': 'chainlink',
+    'LTCUSDT': 'litecoin'
+}
+
+# Kline intervals accepted by Binance (other timeframes fall back to 1h)
+BINANCE_INTERVALS = frozenset({
+    '1m', '5m', '15m', '30m', '1h', '2h', '4h', '6h', '8h', '12h', '1d', '3d', '1w'
+})
+
+# Binance 24hr ticker field for each market data price key (plus volume)
+BINANCE_PRICE_FIELDS = (
+    ('current', 'lastPrice'),
+    ('change', 'priceChangePercent'),
+    ('change_abs', 'priceChange'),
+    ('high', 'highPrice'),
+    ('low', 'lowPrice'),
+    ('open', 'openPrice'),
+    ('volume', 'volume'),
+)
+
+# End-to-end deadline for get_market_data (seconds); the Binance ticker stage
+# leaves FALLBACK_RESERVE for CoinGecko, stages with < MIN_STAGE_TIME left are skipped
+MARKET_DATA_DEADLINE = 10.0
+FALLBACK_RESERVE = 2.0
+MIN_STAGE_TIME = 0.5
+
+# Max concurrent get_market_data calls in a batch (keep <= connector limit_per_host)
+BATCH_CONCURRENCY = 8
+
+class Klines(NamedTuple):
+    """Column-oriented kline data: each field is a 1-D float64 array, oldest candle first"""
+    ts: np.ndarray
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+    
+    @classmethod
+    def from_binance(cls, rows: List[List]) -> 'Klines':
+        """Bulk-parse Binance kline rows ([ts, o, h, l, c, v, ...]) into float columns"""
+        arr = np.asarray(rows, dtype=object)[:, :6].astype(np.float64)
+        # Contiguous columns so slices and C kernels read them without copying
+        return cls(*np.ascontiguousarray(arr.T))
+    
+    def to_dicts(self, last: int) -> List[Dict]:
+        """Materialize the last candles as the row dicts exposed in market data"""
+        return [
+            {'timestamp': int(t), 'open': float(o), 'high': float(h),
+             'low': float(l), 'close': float(c), 'volume': float(v)}
+            for t, o, h, l, c, v in zip(*(col[-last:] for col in self))
+        ]
+
+class CircuitBreaker:
+    """Per-host breaker: CLOSED -> OPEN when the failure ratio over the sampling window
+    crosses the threshold, OPEN -> HALF_OPEN after break_duration (one probe call),
+    HALF_OPEN -> CLOSED on success or back to OPEN on failure"""
+    
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+    
+    def __init__(self, name: str, failure_threshold: float = 0.5, minimum_throughput: int = 5,
+                 sampling_duration: float = 10.0, break_duration: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.minimum_throughput = minimum_throughput
+        self.sampling_duration = sampling_duration
+        self.break_duration = break_duration
+        self.state = self.CLOSED
+        self._samples: deque = deque()  # (monotonic ts, ok)
+        self._opened_at = 0.0
+        self._probing = False
+        self._probe_at = 0.0
+    
+    @property
+    def is_open(self) -> bool:
+        """True if calls should fail fast right now"""
+        if self.state == self.CLOSED:
+            return False
+        if self.state == self.OPEN:
+            if time.monotonic() - self._opened_at < self.break_duration:
+                return True
+            self.state = self.HALF_OPEN
+        # Half-open: let a single probe through (a new one if the last never reported back)
+        now = time.monotonic()
+        if self._probing and now - self._probe_at < self.break_duration:
+            return True
+        self._probing = True
+        self._probe_at = now
+        return False
+    
+    def record_success(self):
+        if self.state == self.HALF_OPEN:
+            logger.info("Circuit for %s closed", self.name)
+            self.state = self.CLOSED
+            self._probing = False
+        if self.state == self.CLOSED:
+            self._record(True)
+    
+    def record_failure(self):
+        if self.state == self.HALF_OPEN:
+            self._probing = False
+            self._open()
+            return
+        if self.state == self.OPEN:
+            # Late result from a call started before the circuit opened
+            return
+        self._record(False)
+        failures = sum(1 for _, ok in self._samples if not ok)
+        if (len(self._samples) >= self.minimum_throughput
+                and failures / len(self._samples) >= self.failure_threshold):
+            self._open()
+    
+    def _record(self, ok: bool):
+        now = time.monotonic()
+        self._samples.append((now, ok))
+        cutoff = now - self.sampling_duration
+        while self._samples and self._samples[0][0] < cutoff:
+            self._samples.popleft()
+    
+    def _open(self):
+        logger.warning("Circuit for %s opened for %.0fs", self.name, self.break_duration)
+        self.state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._samples.clear()
+
+BINANCE_HOST = 'api.binance.com'
+COINGECKO_HOST = 'api.coingecko.com'
+
+# One breaker per upstream host, shared by all scraper instances
+BREAKERS = {host: CircuitBreaker(host) for host in (BINANCE_HOST, COINGECKO_HOST)}
+
+# Bulkhead: max in-flight requests per host, queued in the app rather than the connector
+HOST_CONCURRENCY = {BINANCE_HOST: 8, COINGECKO_HOST: 2}
+
+# Retry policy: full-jitter exponential backoff, only for transient failures
+MAX_RETRIES = 3
+RETRY_BASE = 1.0  # seconds
+RETRY_CAP = 8.0  # seconds
+RETRIABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+class RetryBudget:
+    """Caps retries per host to max_retries within window seconds so outages don't multiply load"""
+    
+    def __init__(self, max_retries: int = 10, window: float = 10.0):
+        self.max_retries = max_retries
+        self.window = window
+        self._stamps: deque = deque()
+    
+    def try_spend(self) -> bool:
+        now = time.monotonic()
+        while self._stamps and now - self._stamps[0] > self.window:
+            self._stamps.popleft()
+        if len(self._stamps) >= self.max_retries:
+            return False
+        self._stamps.append(now)
+        return True
+
+RETRY_BUDGETS = {host: RetryBudget() for host in (BINANCE_HOST, COINGECKO_HOST)}
+
 class TradingViewScraper:
-    def __init__(self):
-        self.session = None
+    # Updated headers to avoid 403 errors
+    HEADERS = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+        'Accept': 'application/json',
+        'Accept-Language': 'en-US,en;q=0.9',
+        # No Accept-Encoding: aiohttp advertises only what it can decode (br needs Brotli)
+        'Connection': 'keep-alive',
+        'Upgrade-Insecure-Requests': '1'
+    }
+    
+    def __init__(self, session: Optional[aiohttp.ClientSession] = None):
+        # Optional shared session (owned by the caller, not closed on exit)
+        self.session = session
+        self._owns_session = session is None
         # Use Binance API directly
-        self.binance_base = "https://api.binance.com/api/v3"
-        # Updated headers to avoid 403 errors
-        self.headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'application/json',
-            'Accept-Language': 'en-US,en;q=0.9',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1'
-        }
+        self.binance_base = f"https://{BINANCE_HOST}/api/v3"
+        self.headers = self.HEADERS
+        # Short-lived response caches plus in-flight fetches, keyed by (endpoint, *args)
+        self._cache = {name: TTLCache(maxsize=CACHE_MAXSIZE, ttl=ttl) for name, ttl in CACHE_TTL.items()}
+        self._inflight: Dict[tuple, asyncio.Future] = {}
+        self._host_sems = {host: asyncio.Semaphore(n) for host, n in HOST_CONCURRENCY.items()}
     
-    async def __aenter__(self):
+    @staticmethod
+    def create_session(limit: int = 20, limit_per_host: int = 10) -> aiohttp.ClientSession:
+        """Create ClientSession with the scraper's headers, SSL and timeouts"""
         # Create connector with proper SSL settings and timeouts
         connector = aiohttp.TCPConnector(
             ssl=True,  # Enable SSL verification
-            limit=10,
-            limit_per_host=5,
+            limit=limit,
+            limit_per_host=limit_per_host,
             ttl_dns_cache=300,
-            use_dns_cache=True
+            use_dns_cache=True,
+            keepalive_timeout=75
         )
         
-        self.session = aiohttp.ClientSession(
-            headers=self.headers,
+        return aiohttp.ClientSession(
+            headers=TradingViewScraper.HEADERS,
             connector=connector,
             timeout=aiohttp.ClientTimeout(total=15, connect=5),
             raise_for_status=False  # Don't raise exceptions for HTTP errors
         )
+    
+    async def __aenter__(self):
+        if self.session is None:
+            self.session = self.create_session()
+            self._owns_session = True
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if self.session:
+        if self.session and self._owns_session:
             await self.session.close()
+            self.session = None
+    
+    async def _cached(self, key: tuple, fetch):
+        """Cached result for key; on a miss, one fetch() is shared by all concurrent callers"""
+        cache = self._cache[key[0]]
+        data = cache.get(key)
+        if data is not None:
+            return data
+        
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fetch())
+            self._inflight[key] = task
+            
+            def _done(t: asyncio.Future):
+                self._inflight.pop(key, None)
+                # Only successful, non-empty responses are cached
+                if not t.cancelled() and t.exception() is None and t.result():
+                    cache[key] = t.result()
+            
+            task.add_done_callback(_done)
+        return await asyncio.shield(task)
+    
+    async def _request_with_retry(self, host: str, url: str, params: Optional[Dict], label: str,
+                                  retries: int = MAX_RETRIES) -> Optional[Any]:
+        """GET url and return parsed JSON; transient failures (429/5xx, timeouts,
+        connection errors) are retried with full-jitter backoff within the host's budget"""
+        breaker, budget, sem = BREAKERS[host], RETRY_BUDGETS[host], self._host_sems[host]
+        for attempt in range(retries):
+            if breaker.is_open:
+                return None
+            try:
+                # The host slot is held for the request only, not the backoff sleep
+                async with sem, self.session.get(url, params=params) as response:
+                    status = response.status
+                    if status == 200:
+                        data = await response.json(loads=_json_loads)
+                        breaker.record_success()
+                        return data
+                    if status not in RETRIABLE_STATUSES:
+                        # Host is healthy, the request itself is bad (e.g. unknown symbol)
+                        breaker.record_success()
+                        logger.error("%s API error: %s", label, status)
+                        return None
+                    breaker.record_failure()
+                    logger.warning("%s API error: %s (attempt %s/%s)", label, status, attempt + 1, retries)
+            except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+                breaker.record_failure()
+                logger.error("Error requesting %s (attempt %s/%s): %s", label, attempt + 1, retries, e)
+            except Exception as e:
+                logger.error("Error requesting %s: %s", label, e)
+                return None
+            
+            if attempt == retries - 1 or not budget.try_spend():
+                return None
+            await asyncio.sleep(random.uniform(0, min(RETRY_CAP, RETRY_BASE * 2 ** attempt)))
+        
+        return None
     
     async def get_market_data(self, symbol: str, timeframe: str = "1h") -> Optional[Dict[str, Any]]:
         """
@@ -63,189 +334,188 @@ class TradingViewScraper:
             Dict dengan data market atau None jika gagal
         """
         try:
-            logger.info(f"Fetching market data for {symbol} ({timeframe})")
+            logger.info("Fetching market data for %s (%s)", symbol, timeframe)
+            deadline = asyncio.get_running_loop().time() + MARKET_DATA_DEADLINE
 
-            # Try Binance API first
-            price_data = await self._get_binance_24hr_ticker(symbol)
+            # Binance ticker and klines are independent: fetch them concurrently
+            price_data, kline_data = await asyncio.gather(
+                self._within(self._get_binance_24hr_ticker(symbol), deadline - FALLBACK_RESERVE),
+                self._within(self._get_binance_klines(symbol, timeframe), deadline)
+            )
 
-            # If Binance fails, try CoinGecko
+            # If Binance fails, try CoinGecko with whatever time is left
             if not price_data:
-                logger.info(f"Binance failed, trying CoinGecko for {symbol}")
-                price_data = await self._get_coingecko_price(symbol)
+                logger.info("Binance failed, trying CoinGecko for %s", symbol)
+                price_data = await self._within(self._get_coingecko_price(symbol), deadline)
 
             if not price_data:
-                logger.warning(f"All APIs failed for {symbol}, no data available")
+                logger.warning("All APIs failed for %s, no data available", symbol)
                 return None
 
-            # Get kline data for technical analysis
-            kline_data = await self._get_binance_klines(symbol, timeframe)
             if not kline_data:
-                logger.warning(f"No kline data for {symbol}, cannot proceed")
+                logger.warning("No kline data for %s, cannot proceed", symbol)
                 return None
 
-            # Calculate technical indicators
-            technical_data = self._calculate_technical_indicators(kline_data)
-
-            # Format market data based on source
-            if 'lastPrice' in price_data:  # Binance format
-                market_data = {
-                    'symbol': symbol,
-                    'timeframe': timeframe,
-                    'timestamp': datetime.now(),
-                    'price': {
-                        'current': float(price_data['lastPrice']),
-                        'change': float(price_data['priceChangePercent']),
-                        'change_abs': float(price_data['priceChange']),
-                        'high': float(price_data['highPrice']),
-                        'low': float(price_data['lowPrice']),
-                        'open': float(price_data['openPrice'])
-                    },
-                    'volume': float(price_data['volume']),
-                    'indicators': technical_data,
-                    'raw_klines': kline_data[-20:]  # Last 20 candles for reference
-                }
-            else:  # CoinGecko format
-                current_price = float(price_data['current_price'])
-                change_24h = float(price_data.get('price_change_percentage_24h', 0))
-                market_data = {
-                    'symbol': symbol,
-                    'timeframe': timeframe,
-                    'timestamp': datetime.now(),
-                    'price': {
-                        'current': current_price,
-                        'change': change_24h,
-                        'change_abs': current_price * (change_24h / 100),
-                        'high': float(price_data.get('high_24h', current_price * 1.05)),
-                        'low': float(price_data.get('low_24h', current_price * 0.95)),
-                        'open': current_price * (1 - change_24h / 100)
-                    },
-                    'volume': float(price_data.get('total_volume', 1000000)),
-                    'indicators': technical_data,
-                    'raw_klines': kline_data[-20:]
-                }
+            # Calculate technical indicators (memoized per cached klines object)
+            technical_data = await self._indicators_for(symbol, timeframe, kline_data)
+
+            price, volume = self._parse_price_data(price_data)
+            market_data = {
+                'symbol': symbol,
+                'timeframe': timeframe,
+                'timestamp': datetime.now(),
+                'price': price,
+                'volume': volume,
+                'indicators': technical_data,
+                'raw_klines': kline_data.to_dicts(20)  # Last 20 candles for reference
+            }
+            # Flat fields for signal scoring, so repeated analyses of cached data skip the lookups
+            market_data['snapshot'] = MarketSnapshot.from_market_data(market_data)
 
-            logger.info(f"Successfully fetched data for {symbol}: ${market_data['price']['current']:,.2f}")
+            logger.info("Successfully fetched data for %s: $%.2f", symbol, market_data['price']['current'])
             return market_data
 
         except Exception as e:
-            logger.error(f"Error fetching market data for {symbol}: {e}")
+            logger.error("Error fetching market data for %s: %s", symbol, e)
             return None
 
+    @staticmethod
+    async def _within(coro, deadline: float):
+        """Await coro until the loop-time deadline; None if it runs out (or too little time is left).
+        Upstream fetches are shielded in _cached, so a timed-out stage still fills the cache"""
+        remaining = deadline - asyncio.get_running_loop().time()
+        if remaining < MIN_STAGE_TIME:
+            coro.close()
+            return None
+        try:
+            return await asyncio.wait_for(coro, remaining)
+        except asyncio.TimeoutError:
+            logger.warning("Market data stage timed out after %.1fs", remaining)
+            return None
+    
+    @staticmethod
+    def _parse_price_data(price_data: Dict) -> tuple:
+        """Normalize a Binance ticker or CoinGecko quote into (price dict, volume)"""
+        if 'lastPrice' in price_data:  # Binance format: one float() per field
+            p = {key: float(price_data[field]) for key, field in BINANCE_PRICE_FIELDS}
+            volume = p.pop('volume')
+            return p, volume
+        
+        # CoinGecko format: derive open/change_abs from the 24h change ratio once
+        current_price = float(price_data['current_price'])
+        change_24h = float(price_data.get('price_change_percentage_24h', 0))
+        change_ratio = change_24h / 100
+        price = {
+            'current': current_price,
+            'change': change_24h,
+            'change_abs': current_price * change_ratio,
+            'high': float(price_data.get('high_24h', current_price * 1.05)),
+            'low': float(price_data.get('low_24h', current_price * 0.95)),
+            'open': current_price * (1 - change_ratio)
+        }
+        return price, float(price_data.get('total_volume', 1000000))
+    
+    async def _indicators_for(self, symbol: str, timeframe: str, klines: Klines) -> Dict[str, Any]:
+        """Indicators are a pure function of the klines, so reuse them while the klines are cached;
+        misses are computed on a worker thread so batched fetches don't stall the event loop"""
+        cache = self._cache['indicators']
+        key = (symbol, timeframe)
+        cached = cache.get(key)
+        if cached is not None and cached[0] is klines:
+            return cached[1]
+        
+        loop = asyncio.get_running_loop()
+        indicators = await loop.run_in_executor(None, self._calculate_technical_indicators, klines)
+        cache[key] = (klines, indicators)
+        return indicators
+    
+    async def get_market_data_batch(self, symbols: List[str], timeframe: str = "1h") -> List:
+        """Fetch market data for symbols concurrently (bounded); exceptions returned in place"""
+        sem = asyncio.Semaphore(BATCH_CONCURRENCY)
+        
+        async def fetch(symbol: str):
+            async with sem:
+                return await self.get_market_data(symbol, timeframe)
+        
+        return await asyncio.gather(*(fetch(symbol) for symbol in symbols), return_exceptions=True)
+    
     async def _get_binance_24hr_ticker(self, symbol: str) -> Optional[Dict]:
+        """Get 24hr ticker data from Binance (cached for CACHE_TTL['ticker'])"""
+        # Served from a fresh all-symbols snapshot (e.g. left by the screener) when there is one
+        tickers = self._cache['all_tickers'].get(('all_tickers',))
+        if tickers and symbol.upper() in tickers:
+            return tickers[symbol.upper()]
+        return await self._cached(('ticker', symbol), lambda: self._fetch_binance_24hr_ticker(symbol))
+    
+    async def _get_all_tickers(self) -> Optional[Dict[str, Dict]]:
+        """All-symbols 24hr tickers indexed by symbol (cached for CACHE_TTL['all_tickers'])"""
+        return await self._cached(('all_tickers',), self._fetch_all_tickers)
+    
+    async def _fetch_all_tickers(self) -> Optional[Dict[str, Dict]]:
+        """Fetch the all-symbols 24hr ticker once and index it by symbol"""
+        data = await self._request_with_retry(
+            BINANCE_HOST, f"{self.binance_base}/ticker/24hr", None,
+            "Binance all tickers", retries=1
+        )
+        if not data:
+            return None
+        return {ticker['symbol']: ticker for ticker in data}
+    
+    async def _fetch_binance_24hr_ticker(self, symbol: str) -> Optional[Dict]:
         """Get 24hr ticker data from Binance with retry logic"""
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                url = f"{self.binance_base}/ticker/24hr"
-                params = {'symbol': symbol.upper()}
-                
-                async with self.session.get(url, params=params) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        logger.info(f"Successfully fetched 24hr ticker for {symbol}")
-                        return data
-                    elif response.status == 429:  # Rate limit
-                        wait_time = 2 ** attempt  # Exponential backoff
-                        logger.warning(f"Rate limited, waiting {wait_time}s before retry {attempt + 1}/{max_retries}")
-                        await asyncio.sleep(wait_time)
-                        continue
-                    else:
-                        logger.error(f"Binance 24hr ticker API error: {response.status}")
-                        if attempt < max_retries - 1:
-                            await asyncio.sleep(1)
-                            continue
-                        return None
-            except Exception as e:
-                logger.error(f"Error getting 24hr ticker from Binance (attempt {attempt + 1}): {e}")
-                if attempt < max_retries - 1:
-                    await asyncio.sleep(2 ** attempt)
-                    continue
-                return None
-        
-        return None
+        data = await self._request_with_retry(
+            BINANCE_HOST, f"{self.binance_base}/ticker/24hr", {'symbol': symbol.upper()},
+            "Binance 24hr ticker"
+        )
+        if data:
+            logger.info("Successfully fetched 24hr ticker for %s", symbol)
+        return data
+    
+    async def _get_binance_klines(self, symbol: str, timeframe: str, limit: int = 100) -> Optional[Klines]:
+        """Get kline data from Binance (cached for CACHE_TTL['klines'])"""
+        return await self._cached(
+            ('klines', symbol, timeframe, limit),
+            lambda: self._fetch_binance_klines(symbol, timeframe, limit)
+        )
     
-    async def _get_binance_klines(self, symbol: str, timeframe: str, limit: int = 100) -> Optional[List[Dict]]:
+    async def _fetch_binance_klines(self, symbol: str, timeframe: str, limit: int = 100) -> Optional[Klines]:
         """Get kline (candlestick) data from Binance with retry logic"""
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                # Convert timeframe format
-                interval_map = {
-                    '1m': '1m', '5m': '5m', '15m': '15m', '30m': '30m',
-                    '1h': '1h', '2h': '2h', '4h': '4h', '6h': '6h', '8h': '8h', '12h': '12h',
-                    '1d': '1d', '3d': '3d', '1w': '1w'
-                }
-                
-                interval = interval_map.get(timeframe, '1h')
-                
-                url = f"{self.binance_base}/klines"
-                params = {
-                    'symbol': symbol.upper(),
-                    'interval': interval,
-                    'limit': limit
-                }
-                
-                async with self.session.get(url, params=params) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        # Convert to standard format
-                        processed_data = []
-                        for kline in data:
-                            processed_data.append({
-                                'timestamp': kline[0],
-                                'open': float(kline[1]),
-                                'high': float(kline[2]),
-                                'low': float(kline[3]),
-                                'close': float(kline[4]),
-                                'volume': float(kline[5])
-                            })
-                        logger.info(f"Successfully fetched {len(processed_data)} klines for {symbol}")
-                        return processed_data
-                    elif response.status == 429:  # Rate limit
-                        wait_time = 2 ** attempt
-                        logger.warning(f"Rate limited, waiting {wait_time}s before retry {attempt + 1}/{max_retries}")
-                        await asyncio.sleep(wait_time)
-                        continue
-                    else:
-                        logger.error(f"Binance klines API error: {response.status}")
-                        if attempt < max_retries - 1:
-                            await asyncio.sleep(1)
-                            continue
-                        return None
-            except Exception as e:
-                logger.error(f"Error getting klines from Binance (attempt {attempt + 1}): {e}")
-                if attempt < max_retries - 1:
-                    await asyncio.sleep(2 ** attempt)
-                    continue
-                return None
+        interval = timeframe if timeframe in BINANCE_INTERVALS else '1h'
         
-        return None
+        params = {
+            'symbol': symbol.upper(),
+            'interval': interval,
+            'limit': limit
+        }
+        
+        data = await self._request_with_retry(
+            BINANCE_HOST, f"{self.binance_base}/klines", params, "Binance klines"
+        )
+        if not data:
+            return None
+        
+        try:
+            klines = Klines.from_binance(data)
+        except (TypeError, ValueError, IndexError) as e:
+            logger.error("Malformed klines from Binance for %s: %s", symbol, e)
+            return None
+        
+        logger.info("Successfully fetched %s klines for %s", len(klines.close), symbol)
+        return klines
     
     async def _get_coingecko_price(self, symbol: str) -> Optional[Dict]:
+        """Get price data from CoinGecko (cached for CACHE_TTL['coingecko'])"""
+        return await self._cached(('coingecko', symbol), lambda: self._fetch_coingecko_price(symbol))
+    
+    async def _fetch_coingecko_price(self, symbol: str) -> Optional[Dict]:
         """Get price data from CoinGecko API as fallback"""
         try:
-            # Map common symbols to CoinGecko IDs
-            symbol_map = {
-                'BTCUSDT': 'bitcoin',
-                'ETHUSDT': 'ethereum',
-                'BNBUSDT': 'binancecoin',
-                'ADAUSDT': 'cardano',
-                'XRPUSDT': 'ripple',
-                'SOLUSDT': 'solana',
-                'DOTUSDT': 'polkadot',
-                'DOGEUSDT': 'dogecoin',
-                'AVAXUSDT': 'avalanche-2',
-                'MATICUSDT': 'matic-network',
-                'LINKUSDT': 'chainlink',
-                'LTCUSDT': 'litecoin'
-            }
-            
-            coin_id = symbol_map.get(symbol)
+            coin_id = COINGECKO_IDS.get(symbol)
             if not coin_id:
-                logger.warning(f"No CoinGecko mapping for {symbol}")
+                logger.warning("No CoinGecko mapping for %s", symbol)
                 return None
             
-            url = "https://api.coingecko.com/api/v3/simple/price"
+            url = f"https://{COINGECKO_HOST}/api/v3/simple/price"
             params = {
                 'ids': coin_id,
                 'vs_currencies': 'usd',
@@ -254,48 +524,43 @@ class TradingViewScraper:
                 'include_last_updated_at': 'true'
             }
             
-            async with self.session.get(url, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    if coin_id in data:
-                        coin_data = data[coin_id]
-                        logger.info(f"Successfully fetched CoinGecko data for {symbol}")
-                        return {
-                            'current_price': coin_data['usd'],
-                            'price_change_percentage_24h': coin_data.get('usd_24h_change', 0),
-                            'total_volume': coin_data.get('usd_24h_vol', 1000000),
-                            'high_24h': coin_data['usd'] * 1.05,  # Estimated
-                            'low_24h': coin_data['usd'] * 0.95    # Estimated
-                        }
-                else:
-                    logger.error(f"CoinGecko API error: {response.status}")
-                    return None
+            # Single attempt: CoinGecko is already the fallback path
+            data = await self._request_with_retry(
+                COINGECKO_HOST, url, params, "CoinGecko", retries=1
+            )
+            if data and coin_id in data:
+                coin_data = data[coin_id]
+                logger.info("Successfully fetched CoinGecko data for %s", symbol)
+                return {
+                    'current_price': coin_data['usd'],
+                    'price_change_percentage_24h': coin_data.get('usd_24h_change', 0),
+                    'total_volume': coin_data.get('usd_24h_vol', 1000000),
+                    'high_24h': coin_data['usd'] * 1.05,  # Estimated
+                    'low_24h': coin_data['usd'] * 0.95    # Estimated
+                }
         except Exception as e:
-            logger.error(f"Error getting CoinGecko data: {e}")
+            logger.error("Error getting CoinGecko data: %s", e)
             return None
 
         return None
     
     
-    def _calculate_technical_indicators(self, klines: List[Dict]) -> Dict[str, Any]:
+    def _calculate_technical_indicators(self, klines: Klines) -> Dict[str, Any]:
         """Calculate technical indicators from kline data"""
         try:
-            if len(klines) < 50:
+            if len(klines.close) < 50:
                 logger.warning("Not enough data for technical analysis")
                 return self._get_default_indicators()
             
-            # Extract price data
-            closes = [k['close'] for k in klines]
-            highs = [k['high'] for k in klines]
-            lows = [k['low'] for k in klines]
-            volumes = [k['volume'] for k in klines]
+            # Columns are already float arrays; indicators below are vectorized
+            closes, highs, lows = klines.close, klines.high, klines.low
             
             # Calculate RSI (14-period)
             rsi = self._calculate_rsi(closes, period=14)
             
             # Calculate Moving Averages
-            sma_20 = sum(closes[-20:]) / 20
-            sma_50 = sum(closes[-50:]) / 50 if len(closes) >= 50 else sum(closes) / len(closes)
+            sma_20 = float(closes[-20:].mean())
+            sma_50 = float(closes[-50:].mean())
             
             ema_20 = self._calculate_ema(closes, period=20)
             ema_50 = self._calculate_ema(closes, period=50)
@@ -309,7 +574,10 @@ class TradingViewScraper:
             # Calculate trend strength
             trend_strength = self._calculate_trend_strength(closes, highs, lows)
             
-            current_price = closes[-1]
+            # Average True Range (volatility for TP/SL levels)
+            atr = self._calculate_atr(highs, lows, closes)
+            
+            current_price = float(closes[-1])
             
             return {
                 'rsi': rsi,
@@ -324,6 +592,7 @@ class TradingViewScraper:
                 'bb_middle': bb_middle,
                 'bb_lower': bb_lower,
                 'trend_strength': trend_strength,
+                'atr': atr,
                 'price_position': {
                     'above_sma20': current_price > sma_20,
                     'above_sma50': current_price > sma_50,
@@ -333,7 +602,7 @@ class TradingViewScraper:
             }
             
         except Exception as e:
-            logger.error(f"Error calculating technical indicators: {e}")
+            logger.error("Error calculating technical indicators: %s", e)
             return self._get_default_indicators()
     
     def _get_default_indicators(self) -> Dict[str, Any]:
@@ -351,6 +620,7 @@ class TradingViewScraper:
             'bb_middle': 0.0,
             'bb_lower': 0.0,
             'trend_strength': 0.0,
+            'atr': 0.0,
             'price_position': {
                 'above_sma20': False,
                 'above_sma50': False,
@@ -359,116 +629,128 @@ class TradingViewScraper:
             }
         }
     
-    def _calculate_rsi(self, prices: List[float], period: int = 14) -> float:
+    # Indicator helpers take float arrays (lists are converted); errors are
+    # handled by _calculate_technical_indicators
+    def _calculate_rsi(self, prices: np.ndarray, period: int = 14) -> float:
         """Calculate RSI (Relative Strength Index)"""
-        try:
-            if len(prices) < period + 1:
-                return 50.0
-            
-            deltas = [prices[i] - prices[i-1] for i in range(1, len(prices))]
-            gains = [d if d > 0 else 0 for d in deltas]
-            losses = [-d if d < 0 else 0 for d in deltas]
-            
-            avg_gain = sum(gains[-period:]) / period
-            avg_loss = sum(losses[-period:]) / period
-            
-            if avg_loss == 0:
-                return 100.0
-            
-            rs = avg_gain / avg_loss
-            rsi = 100 - (100 / (1 + rs))
-            return round(rsi, 2)
-            
-        except Exception:
+        prices = np.asarray(prices, dtype=np.float64)
+        if len(prices) < period + 1:
             return 50.0
+        
+        deltas = np.diff(prices[-(period + 1):])
+        avg_gain = deltas.clip(min=0).sum() / period
+        avg_loss = -deltas.clip(max=0).sum() / period
+        
+        if avg_loss == 0:
+            return 100.0
+        
+        rs = avg_gain / avg_loss
+        rsi = 100 - (100 / (1 + rs))
+        return float(rsi)
     
-    def _calculate_ema(self, prices: List[float], period: int) -> float:
+    def _calculate_ema(self, prices: np.ndarray, period: int) -> float:
         """Calculate EMA (Exponential Moving Average)"""
-        try:
-            if len(prices) < period:
-                return sum(prices) / len(prices)
-            
-            multiplier = 2 / (period + 1)
-            ema = sum(prices[:period]) / period  # Start with SMA
-            
-            for price in prices[period:]:
-                ema = (price * multiplier) + (ema * (1 - multiplier))
-            
-            return round(ema, 4)
-            
-        except Exception:
-            return 0.0
+        prices = np.asarray(prices, dtype=np.float64)
+        if len(prices) < period:
+            return float(prices.mean())
+        
+        # Closed form of the SMA-seeded recursive EMA:
+        # ema = decay^m * sma + sum(multiplier * decay^(m-1-k) * price_k)
+        multiplier = 2 / (period + 1)
+        decay = 1 - multiplier
+        rest = prices[period:]
+        weights = multiplier * decay ** np.arange(len(rest) - 1, -1, -1)
+        ema = decay ** len(rest) * prices[:period].mean() + weights @ rest
+        
+        return float(ema)
+    
+    @staticmethod
+    def _ema_series(prices: np.ndarray, period: int) -> np.ndarray:
+        """SMA-seeded EMA at every index from period-1 on, in one linear pass"""
+        if talib is not None:
+            return talib.EMA(prices, timeperiod=period)[period - 1:]
+        
+        multiplier = 2 / (period + 1)
+        series = np.empty(len(prices) - period + 1)
+        ema = series[0] = prices[:period].mean()
+        for i, price in enumerate(prices[period:].tolist(), 1):
+            ema = (price * multiplier) + (ema * (1 - multiplier))
+            series[i] = ema
+        return series
     
-    def _calculate_macd(self, prices: List[float]) -> tuple:
+    def _calculate_macd(self, prices: np.ndarray) -> tuple:
         """Calculate MACD (Moving Average Convergence Divergence)"""
-        try:
-            if len(prices) < 26:
-                return 0.0, 0.0, 0.0
-            
-            ema_12 = self._calculate_ema(prices, 12)
-            ema_26 = self._calculate_ema(prices, 26)
-            macd_line = ema_12 - ema_26
-            
-            # Calculate signal line (9-period EMA of MACD)
-            macd_values = []
-            for i in range(26, len(prices)):
-                ema_12_temp = self._calculate_ema(prices[:i+1], 12)
-                ema_26_temp = self._calculate_ema(prices[:i+1], 26)
-                macd_values.append(ema_12_temp - ema_26_temp)
-            
-            if len(macd_values) >= 9:
-                macd_signal = self._calculate_ema(macd_values, 9)
-            else:
-                macd_signal = 0.0
-            
-            macd_histogram = macd_line - macd_signal
-            
-            return round(macd_line, 6), round(macd_signal, 6), round(macd_histogram, 6)
-            
-        except Exception:
+        prices = np.asarray(prices, dtype=np.float64)
+        if len(prices) < 26:
             return 0.0, 0.0, 0.0
+        
+        # Full EMA12/EMA26 series once (linear), instead of recomputing both
+        # EMAs from scratch for every prefix of prices
+        ema_12 = self._ema_series(prices, 12)
+        ema_26 = self._ema_series(prices, 26)
+        macd_line = float(ema_12[-1] - ema_26[-1])
+        
+        # Calculate signal line (9-period EMA of MACD from index 26 on)
+        macd_values = ema_12[26 - 11:] - ema_26[1:]
+        
+        if len(macd_values) >= 9:
+            macd_signal = self._calculate_ema(macd_values, 9)
+        else:
+            macd_signal = 0.0
+        
+        macd_histogram = macd_line - macd_signal
+        
+        return macd_line, macd_signal, macd_histogram
     
-    def _calculate_bollinger_bands(self, prices: List[float], period: int = 20, std_dev: float = 2) -> tuple:
+    def _calculate_bollinger_bands(self, prices: np.ndarray, period: int = 20, std_dev: float = 2) -> tuple:
         """Calculate Bollinger Bands"""
-        try:
-            if len(prices) < period:
-                avg = sum(prices) / len(prices)
-                return avg, avg, avg
-            
-            sma = sum(prices[-period:]) / period
-            variance = sum([(price - sma) ** 2 for price in prices[-period:]]) / period
-            std = variance ** 0.5
-            
-            bb_upper = sma + (std * std_dev)
-            bb_lower = sma - (std * std_dev)
-            
-            return round(bb_upper, 4), round(sma, 4), round(bb_lower, 4)
-            
-        except Exception:
-            return 0.0, 0.0, 0.0
+        prices = np.asarray(prices, dtype=np.float64)
+        if len(prices) < period:
+            avg = float(prices.mean())
+            return avg, avg, avg
+        
+        window = prices[-period:]
+        sma = float(window.mean())
+        std = float(window.std())  # population std (ddof=0)
+        
+        bb_upper = sma + (std * std_dev)
+        bb_lower = sma - (std * std_dev)
+        
+        return bb_upper, sma, bb_lower
+    
+    def _calculate_atr(self, highs: np.ndarray, lows: np.ndarray, closes: np.ndarray, period: int = 14) -> float:
+        """Calculate ATR (Wilder's Average True Range, seeded like TA-Lib)"""
+        if len(closes) <= period:
+            return 0.0
+        if talib is not None:
+            return float(talib.ATR(highs, lows, closes, timeperiod=period)[-1])
+        
+        # True range from the second candle on (needs the previous close)
+        prev_close = closes[:-1]
+        tr = np.maximum(highs[1:] - lows[1:], np.maximum(abs(highs[1:] - prev_close), abs(lows[1:] - prev_close)))
+        
+        # Wilder smoothing is an EMA with multiplier 1/period, seeded with the SMA of the first TRs
+        decay = 1 - 1 / period
+        rest = tr[period:]
+        weights = (1 / period) * decay ** np.arange(len(rest) - 1, -1, -1)
+        return float(decay ** len(rest) * tr[:period].mean() + weights @ rest)
     
-    def _calculate_trend_strength(self, closes: List[float], highs: List[float], lows: List[float]) -> float:
+    def _calculate_trend_strength(self, closes: np.ndarray, highs: np.ndarray, lows: np.ndarray) -> float:
         """Calculate trend strength (0-100)"""
-        try:
-            if len(closes) < 20:
-                return 50.0
-            
-            # Simple trend calculation based on price movement
-            recent_closes = closes[-10:]
-            older_closes = closes[-20:-10]
-            
-            recent_avg = sum(recent_closes) / len(recent_closes)
-            older_avg = sum(older_closes) / len(older_closes)
-            
-            trend = ((recent_avg - older_avg) / older_avg) * 100
-            
-            # Normalize to 0-100 scale
-            strength = min(100, max(0, 50 + trend * 10))
-            
-            return round(strength, 2)
-            
-        except Exception:
+        closes = np.asarray(closes, dtype=np.float64)
+        if len(closes) < 20:
             return 50.0
+        
+        # Simple trend calculation based on price movement
+        recent_avg = closes[-10:].mean()
+        older_avg = closes[-20:-10].mean()
+        
+        trend = ((recent_avg - older_avg) / older_avg) * 100
+        
+        # Normalize to 0-100 scale
+        strength = min(100, max(0, 50 + trend * 10))
+        
+        return float(strength)
     
     async def get_crypto_screener(self, limit: int = 20) -> List[Dict[str, Any]]:
         """
@@ -478,44 +760,43 @@ class TradingViewScraper:
             limit: Number of symbols to return
             
         Returns:
-            List of crypto data
+            List of crypto data (cached for CACHE_TTL['screener'])
         """
+        return await self._cached(('screener', limit), lambda: self._fetch_crypto_screener(limit))
+    
+    async def _fetch_crypto_screener(self, limit: int) -> List[Dict[str, Any]]:
+        """Rank USDT pairs from the all-symbols 24hr ticker"""
+        tickers = await self._get_all_tickers()
+        if not tickers:
+            return self._get_fallback_screener_data(limit)
+        
         try:
-            url = f"{self.binance_base}/ticker/24hr"
-            
-            async with self.session.get(url) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    
-                    # Filter only USDT pairs and sort by volume
-                    usdt_pairs = [
-                        item for item in data 
-                        if item['symbol'].endswith('USDT') and 
-                        float(item['volume']) > 1000000
-                    ]
-                    
-                    # Sort by 24h quote volume (volume in USDT)
-                    usdt_pairs.sort(key=lambda x: float(x['quoteVolume']), reverse=True)
-                    
-                    # Format the data
-                    screener_data = []
-                    for item in usdt_pairs[:limit]:
-                        screener_data.append({
-                            'symbol': item['symbol'],
-                            'price': float(item['lastPrice']),
-                            'change_24h': float(item['priceChangePercent']),
-                            'volume_24h': float(item['quoteVolume']),
-                            'high_24h': float(item['highPrice']),
-                            'low_24h': float(item['lowPrice'])
-                        })
-                    
-                    logger.info(f"Successfully fetched screener data for {len(screener_data)} symbols")
-                    return screener_data
-                else:
-                    logger.error(f"Binance screener API error: {response.status}")
-                    return self._get_fallback_screener_data(limit)
+            # Filter only USDT pairs, converting quote volume (volume in USDT) once per item
+            candidates = [
+                (float(item['quoteVolume']), item) for item in tickers.values()
+                if item['symbol'].endswith('USDT') and
+                float(item['volume']) > 1000000
+            ]
+            
+            # Top `limit` by 24h quote volume without sorting every pair
+            top = heapq.nlargest(limit, candidates, key=lambda c: c[0])
+            
+            # Format the data
+            screener_data = []
+            for quote_volume, item in top:
+                screener_data.append({
+                    'symbol': item['symbol'],
+                    'price': float(item['lastPrice']),
+                    'change_24h': float(item['priceChangePercent']),
+                    'volume_24h': quote_volume,
+                    'high_24h': float(item['highPrice']),
+                    'low_24h': float(item['lowPrice'])
+                })
+            
+            logger.info("Successfully fetched screener data for %s symbols", len(screener_data))
+            return screener_data
         except Exception as e:
-            logger.error(f"Error getting crypto screener: {e}")
+            logger.error("Error getting crypto screener: %s", e)
             return self._get_fallback_screener_data(limit)
     
     def _get_fallback_screener_data(self, limit: int) -> List[Dict[str, Any]]:
@@ -539,186 +820,255 @@ class TradingViewScraper:
                 'recommendation': d[6] if len(d) > 6 else 0
             }
         except Exception as e:
-            logger.error(f"Error processing screener item: {e}")
+            logger.error("Error processing screener item: %s", e)
             return {}
 
 # Technical Analysis Functions
+class MarketSnapshot(NamedTuple):
+    """Flat view of the market data fields signal scoring reads (defaults as in the dict path)"""
+    current: float
+    high: float
+    low: float
+    rsi: float
+    macd: float
+    macd_signal: float
+    macd_histogram: float
+    ema_20: float
+    ema_50: float
+    bb_upper: float
+    bb_lower: float
+    trend_strength: float
+    atr: float
+    
+    @classmethod
+    def from_market_data(cls, data: Dict) -> 'MarketSnapshot':
+        """Built once per market data dict; get_market_data stores it under 'snapshot'"""
+        snapshot = data.get('snapshot')
+        if snapshot is not None:
+            return snapshot
+        price = data.get('price', {})
+        indicators = data.get('indicators', {})
+        current = price.get('current', 0)
+        return cls(
+            current=current,
+            high=price.get('high', current),
+            low=price.get('low', current),
+            rsi=indicators.get('rsi', 50),
+            macd=indicators.get('macd', 0),
+            macd_signal=indicators.get('macd_signal', 0),
+            macd_histogram=indicators.get('macd_histogram', 0),
+            ema_20=indicators.get('ema_20', current),
+            ema_50=indicators.get('ema_50', current),
+            bb_upper=indicators.get('bb_upper', 0),
+            bb_lower=indicators.get('bb_lower', 0),
+            trend_strength=indicators.get('trend_strength', 50),
+            atr=indicators.get('atr', 0)
+        )
+
+# MarketSnapshot fields in declaration order (columns of the batch scoring matrix)
+SNAPSHOT_FIELDS = MarketSnapshot._fields
+
+# Signal rules in evaluation order, their confidence weights, and the analysis
+# label for each vote (+1 LONG, -1 SHORT, 0 no signal)
+SIGNAL_RULES = ('rsi', 'macd', 'ma', 'bb', 'trend')
+SIGNAL_WEIGHTS = np.array([0.8, 0.7, 0.6, 0.5, 0.4])
+SIGNAL_NAMES = {1: 'LONG', -1: 'SHORT', 0: 'NEUTRAL'}
+SIGNAL_LABELS = {
+    'rsi': {1: "Oversold", -1: "Overbought", 0: "Neutral"},
+    'macd': {1: "Bullish crossover", -1: "Bearish crossover", 0: "No clear signal"},
+    'ma': {
+        1: "Price above moving averages",
+        -1: "Price below moving averages",
+        0: "Mixed signals from moving averages"
+    },
+    'bb': {
+        1: "Price below lower band (oversold)",
+        -1: "Price above upper band (overbought)",
+        0: "Price within bands (normal)"
+    },
+    'trend': {1: "Strong uptrend", -1: "Strong downtrend", 0: "Neutral trend"},
+}
+
 class TechnicalAnalysis:
     @staticmethod
-    def calculate_signal_strength(data: Dict) -> Dict[str, Any]:
+    def calculate_signal_strength(data: Dict, now: Optional[datetime] = None) -> Dict[str, Any]:
         """
         Hitung kekuatan sinyal berdasarkan indikator teknikal
         
         Args:
             data: Market data dengan indicators
+            now: Timestamp untuk hasil (default: datetime.now())
             
         Returns:
             Dict dengan analisis sinyal
         """
-        try:
-            indicators = data.get('indicators', {})
-            price = data.get('price', {})
-            
-            signals = []
-            confidence_factors = []
-            analysis = {}
-            
-            # RSI Analysis
-            rsi = indicators.get('rsi', 50)
-            if rsi < 30:
-                signals.append('LONG')
-                confidence_factors.append(0.8)
-                analysis['rsi'] = f"Oversold (RSI: {rsi:.1f})"
-            elif rsi > 70:
-                signals.append('SHORT')
-                confidence_factors.append(0.8)
-                analysis['rsi'] = f"Overbought (RSI: {rsi:.1f})"
-            else:
-                analysis['rsi'] = f"Neutral (RSI: {rsi:.1f})"
-            
-            # MACD Analysis
-            macd = indicators.get('macd', 0)
-            macd_signal = indicators.get('macd_signal', 0)
-            macd_histogram = indicators.get('macd_histogram', 0)
-            
-            if macd > macd_signal and macd_histogram > 0:
-                signals.append('LONG')
-                confidence_factors.append(0.7)
-                analysis['macd'] = "Bullish crossover"
-            elif macd < macd_signal and macd_histogram < 0:
-                signals.append('SHORT')
-                confidence_factors.append(0.7)
-                analysis['macd'] = "Bearish crossover"
-            else:
-                analysis['macd'] = "No clear signal"
-            
-            # Moving Average Analysis
-            current_price = price.get('current', 0)
-            ema_20 = indicators.get('ema_20', current_price)
-            ema_50 = indicators.get('ema_50', current_price)
-            sma_20 = indicators.get('sma_20', current_price)
-            sma_50 = indicators.get('sma_50', current_price)
-            
-            if current_price > ema_20 > ema_50:
-                signals.append('LONG')
-                confidence_factors.append(0.6)
-                analysis['ma'] = "Price above moving averages"
-            elif current_price < ema_20 < ema_50:
-                signals.append('SHORT')
-                confidence_factors.append(0.6)
-                analysis['ma'] = "Price below moving averages"
-            else:
-                analysis['ma'] = "Mixed signals from moving averages"
-            
-            # Bollinger Bands Analysis
-            bb_upper = indicators.get('bb_upper', 0)
-            bb_lower = indicators.get('bb_lower', 0)
-            bb_middle = indicators.get('bb_middle', 0)
-            
-            if current_price > bb_upper:
-                signals.append('SHORT')
-                confidence_factors.append(0.5)
-                analysis['bb'] = "Price above upper band (overbought)"
-            elif current_price < bb_lower:
-                signals.append('LONG')
-                confidence_factors.append(0.5)
-                analysis['bb'] = "Price below lower band (oversold)"
-            else:
-                analysis['bb'] = "Price within bands (normal)"
-            
-            # Trend Analysis
-            trend_strength = indicators.get('trend_strength', 50)
-            if trend_strength > 70:
-                signals.append('LONG')
-                confidence_factors.append(0.4)
-                analysis['trend'] = f"Strong uptrend ({trend_strength:.1f}%)"
-            elif trend_strength < 30:
-                signals.append('SHORT')
-                confidence_factors.append(0.4)
-                analysis['trend'] = f"Strong downtrend ({trend_strength:.1f}%)"
-            else:
-                analysis['trend'] = f"Neutral trend ({trend_strength:.1f}%)"
-            
-            # Calculate overall signal
-            long_signals = signals.count('LONG')
-            short_signals = signals.count('SHORT')
-            
-            if long_signals > short_signals:
-                overall_signal = 'LONG'
-                confidence = sum(confidence_factors[:long_signals]) / len(confidence_factors) if confidence_factors else 0
-            elif short_signals > long_signals:
-                overall_signal = 'SHORT'
-                confidence = sum(confidence_factors[:short_signals]) / len(confidence_factors) if confidence_factors else 0
+        return TechnicalAnalysis.calculate_signal_strength_batch([data], now)[0]
+    
+    @staticmethod
+    def calculate_signal_strength_batch(data_list: List[Dict], now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Score many market data dicts at once; votes, confidence and strength are
+        computed column-wise over all rows (same results as calculate_signal_strength).
+        All results share one timestamp: now, or the time of the call"""
+        if now is None:
+            now = datetime.now()
+        results: List[Optional[Dict[str, Any]]] = [None] * len(data_list)
+        rows, values = [], []
+        for i, data in enumerate(data_list):
+            if TechnicalAnalysis._is_valid(data):
+                rows.append(i)
+                values.append(MarketSnapshot.from_market_data(data))
             else:
-                overall_signal = 'NEUTRAL'
-                confidence = 0.3
+                results[i] = TechnicalAnalysis.get_default_signal(data, now)
+        
+        if rows:
+            try:
+                matrix = np.array(values, dtype=np.float64)
+            except (TypeError, ValueError):
+                # Non-numeric values in some rows: score the numeric ones, default the rest
+                numeric_rows, numeric_values = [], []
+                for i, row in zip(rows, values):
+                    try:
+                        numeric_values.append(np.array(row, dtype=np.float64))
+                        numeric_rows.append(i)
+                    except (TypeError, ValueError) as e:
+                        logger.error("Error calculating signal strength: %s", e)
+                        results[i] = TechnicalAnalysis.get_default_signal(data_list[i], now)
+                rows = numeric_rows
+                matrix = np.array(numeric_values).reshape(len(rows), len(SNAPSHOT_FIELDS))
+            
+            for i, result in zip(rows, TechnicalAnalysis._score_matrix(matrix, now)):
+                results[i] = result
+        
+        return results
+    
+    @staticmethod
+    def _score_matrix(matrix: np.ndarray, now: datetime) -> List[Dict[str, Any]]:
+        """Vectorized scoring kernel over a (N, len(SNAPSHOT_FIELDS)) float matrix"""
+        (current, high, low, rsi, macd, macd_signal, macd_histogram,
+         ema_20, ema_50, bb_upper, bb_lower, trend_strength, _atr) = matrix.T
+        i8 = np.int8
+        
+        # One vote column per rule in SIGNAL_RULES order: +1 LONG, -1 SHORT, 0 none
+        votes = np.column_stack([
+            (rsi < 30).astype(i8) - (rsi > 70),
+            ((macd > macd_signal) & (macd_histogram > 0)).astype(i8)
+            - ((macd < macd_signal) & (macd_histogram < 0)),
+            ((current > ema_20) & (ema_20 > ema_50)).astype(i8)
+            - ((current < ema_20) & (ema_20 < ema_50)),
+            np.where(current > bb_upper, -1, current < bb_lower).astype(i8),
+            (trend_strength > 70).astype(i8) - (trend_strength < 30),
+        ])
+        
+        # Overall signal per row; confidence sums the first n (= winning vote
+        # count) weights of the rules that voted, over all that voted
+        active = votes != 0
+        long_signals = (votes > 0).sum(axis=1)
+        short_signals = (votes < 0).sum(axis=1)
+        direction = np.sign(long_signals - short_signals)
+        strength = np.where(direction != 0, np.maximum(long_signals, short_signals), 0)
+        counted = active & (np.cumsum(active, axis=1) <= strength[:, None])
+        confidence = np.where(
+            direction != 0,
+            (SIGNAL_WEIGHTS * counted).sum(axis=1) / np.maximum(active.sum(axis=1), 1),
+            0.3
+        )
+        
+        results = []
+        for row, row_votes, row_direction, row_confidence, row_strength in zip(
+            matrix.tolist(), votes.tolist(), direction.tolist(), confidence.tolist(), strength.tolist()
+        ):
+            current_price, row_high, row_low, row_rsi = row[:4]
+            label = {rule: SIGNAL_LABELS[rule][vote] for rule, vote in zip(SIGNAL_RULES, row_votes)}
+            overall_signal = SIGNAL_NAMES[row_direction]
             
             # Calculate risk levels
-            risk_data = TechnicalAnalysis.calculate_risk_levels(data, overall_signal)
+            take_profit, stop_loss, risk_reward_ratio = TechnicalAnalysis._risk_levels(
+                current_price, row_high, row_low, overall_signal, row[12]
+            )
             
-            return {
+            results.append({
                 'signal': overall_signal,
-                'confidence': round(confidence * 100, 1),
-                'strength': len([s for s in signals if s == overall_signal]),
-                'analysis': analysis,
-                'take_profit': risk_data['take_profit'],
-                'stop_loss': risk_data['stop_loss'],
-                'risk_reward_ratio': risk_data['risk_reward_ratio'],
+                'confidence': round(row_confidence * 100, 1),
+                'strength': row_strength,
+                'analysis': {
+                    'rsi': f"{label['rsi']} (RSI: {row_rsi:.1f})",
+                    'macd': label['macd'],
+                    'ma': label['ma'],
+                    'bb': label['bb'],
+                    'trend': f"{label['trend']} ({row[11]:.1f}%)"
+                },
+                'take_profit': take_profit,
+                'stop_loss': stop_loss,
+                'risk_reward_ratio': risk_reward_ratio,
                 'entry_price': current_price,
-                'timestamp': datetime.now()
-            }
-            
-        except Exception as e:
-            logger.error(f"Error calculating signal strength: {e}")
-            return TechnicalAnalysis.get_default_signal(data)
+                'timestamp': now
+            })
+        return results
+    
+    @staticmethod
+    def _is_valid(data) -> bool:
+        """Market data shape check done up front instead of relying on a broad except"""
+        return (
+            isinstance(data, dict)
+            and isinstance(data.get('price', {}), dict)
+            and isinstance(data.get('indicators', {}), dict)
+        )
     
     @staticmethod
     def calculate_risk_levels(data: Dict, signal: str) -> Dict[str, float]:
         """Calculate take profit and stop loss levels"""
+        if not TechnicalAnalysis._is_valid(data):
+            return {'take_profit': 0, 'stop_loss': 0, 'risk_reward_ratio': 0}
+        
         try:
-            price = data.get('price', {})
-            current_price = price.get('current', 0)
-            
-            if current_price == 0:
-                return {'take_profit': 0, 'stop_loss': 0, 'risk_reward_ratio': 0}
-            
-            # Estimate volatility from high/low
-            high = price.get('high', current_price)
-            low = price.get('low', current_price)
-            atr_estimate = abs(high - low)
-            
-            if atr_estimate == 0:
-                atr_estimate = current_price * 0.02  # 2% fallback
-            
-            if signal == 'LONG':
-                stop_loss = current_price - (atr_estimate * 1.5)
-                take_profit = current_price + (atr_estimate * 2.5)
-            elif signal == 'SHORT':
-                stop_loss = current_price + (atr_estimate * 1.5)
-                take_profit = current_price - (atr_estimate * 2.5)
-            else:
-                stop_loss = current_price
-                take_profit = current_price
-            
-            # Calculate risk-reward ratio
-            risk = abs(current_price - stop_loss)
-            reward = abs(take_profit - current_price)
-            risk_reward_ratio = reward / risk if risk > 0 else 0
-            
+            snap = MarketSnapshot.from_market_data(data)
+            take_profit, stop_loss, risk_reward_ratio = TechnicalAnalysis._risk_levels(
+                snap.current, snap.high, snap.low, signal, snap.atr
+            )
             return {
-                'take_profit': round(take_profit, 4),
-                'stop_loss': round(stop_loss, 4),
-                'risk_reward_ratio': round(risk_reward_ratio, 2)
+                'take_profit': take_profit,
+                'stop_loss': stop_loss,
+                'risk_reward_ratio': risk_reward_ratio
             }
             
-        except Exception as e:
-            logger.error(f"Error calculating risk levels: {e}")
+        except (TypeError, ValueError) as e:
+            logger.error("Error calculating risk levels: %s", e)
             return {'take_profit': 0, 'stop_loss': 0, 'risk_reward_ratio': 0}
     
     @staticmethod
-    def get_default_signal(data: Dict) -> Dict[str, Any]:
+    @lru_cache(maxsize=4096)
+    def _risk_levels(current_price: float, high: float, low: float, signal: str, atr: float = 0.0) -> tuple:
+        """(take_profit, stop_loss, risk_reward_ratio); pure, so memoized on its inputs"""
+        if current_price == 0:
+            return 0, 0, 0
+        
+        # Volatility: candle ATR when available, else the 24h high/low range
+        atr_estimate = atr or abs(high - low)
+        
+        if atr_estimate == 0:
+            atr_estimate = current_price * 0.02  # 2% fallback
+        
+        if signal == 'LONG':
+            stop_loss = current_price - (atr_estimate * 1.5)
+            take_profit = current_price + (atr_estimate * 2.5)
+        elif signal == 'SHORT':
+            stop_loss = current_price + (atr_estimate * 1.5)
+            take_profit = current_price - (atr_estimate * 2.5)
+        else:
+            stop_loss = current_price
+            take_profit = current_price
+        
+        # Calculate risk-reward ratio
+        risk = abs(current_price - stop_loss)
+        reward = abs(take_profit - current_price)
+        risk_reward_ratio = reward / risk if risk > 0 else 0
+        
+        return round(take_profit, 4), round(stop_loss, 4), round(risk_reward_ratio, 2)
+    
+    @staticmethod
+    def get_default_signal(data: Dict, now: Optional[datetime] = None) -> Dict[str, Any]:
         """Return default signal when calculation fails"""
-        price = data.get('price', {}).get('current', 0)
+        price = data.get('price', {}).get('current', 0) if TechnicalAnalysis._is_valid(data) else 0
         return {
             'signal': 'NEUTRAL',
             'confidence': 0,
@@ -734,7 +1084,7 @@ class TechnicalAnalysis:
             'stop_loss': price,
             'risk_reward_ratio': 0,
             'entry_price': price,
-            'timestamp': datetime.now()
+            'timestamp': now or datetime.now()
         }
 
 
@@ -747,12 +1097,15 @@ async def test_tradingview_scraper():
         # Test market data
         symbols = ['BTCUSDT', 'ETHUSDT', 'BNBUSDT']
         
-        for symbol in symbols:
+        # All symbols fetched concurrently (bounded by BATCH_CONCURRENCY)
+        results = await scraper.get_market_data_batch(symbols, '1h')
+        
+        for symbol, data in zip(symbols, results):
             print(f"\n📊 Testing {symbol}...")
             
-            data = await scraper.get_market_data(symbol, '1h')
-            
-            if data:
+            if isinstance(data, Exception):
+                print(f"❌ Error fetching data for {symbol}: {data}")
+            elif data:
                 print(f"✅ Data fetched for {symbol}")
                 print(f"   Price: ${data['price']['current']:,.2f}")
                 print(f"   Change: {data['price']['change']:+.2f}%")
@@ -764,8 +1117,6 @@ async def test_tradingview_scraper():
                 
             else:
                 print(f"❌ Failed to fetch data for {symbol}")
-            
-            await asyncio.sleep(1)  # Rate limiting
 
 
 if __name__ == "__main__":
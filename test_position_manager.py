@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Test script for PositionManager manual close
+"""
+
+import asyncio
+import sys
+import os
+
+# Add the parent directory to the path to import modules
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import DatabaseManager
+from handlers.position_monitor import PositionManager
+
+TEST_DB = "test_position_manager.db"
+
+class FakeMonitor:
+    """Records wake() calls instead of running the monitor loop"""
+    def __init__(self):
+        self.wakes = 0
+
+    def wake(self):
+        self.wakes += 1
+
+async def test_close_position_manually():
+    print("🧪 Testing manual position close...")
+
+    db = DatabaseManager(TEST_DB)
+    await db.init_database()
+    try:
+        monitor = FakeMonitor()
+        manager = PositionManager(db, monitor)
+
+        position_id = await manager.create_position(
+            user_id=123456789,
+            symbol='ETHUSDT',
+            direction='SHORT',
+            entry_price=3800.0,
+            take_profit=3600.0,
+            stop_loss=4000.0,
+            quantity=0.1
+        )
+        assert position_id, "position not created"
+        wakes = monitor.wakes
+
+        closed = await manager.close_position_manually(position_id, 3700.0)
+        assert closed is True, "manual close returned False"
+        assert monitor.wakes == wakes + 1, "monitor not woken on manual close"
+
+        position = await db.get_position_by_id(position_id)
+        assert position['status'] == 'CLOSED_MANUAL', position['status']
+        assert abs(position['pnl'] - 10.0) < 1e-9, position['pnl']
+
+        # Already closed: second close is rejected
+        assert await manager.close_position_manually(position_id, 3700.0) is False
+        print("✅ Manual close returns True and wakes the monitor")
+    finally:
+        await db.close()
+        for path in (TEST_DB, TEST_DB + '-wal', TEST_DB + '-shm'):
+            if os.path.exists(path):
+                os.remove(path)
+
+if __name__ == "__main__":
+    asyncio.run(test_close_position_manually())
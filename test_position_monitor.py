@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Test script for PositionMonitor market data freshness
+"""
+
+import asyncio
+import sys
+import os
+from unittest import mock
+
+# Add the parent directory to the path to import modules
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from handlers.position_monitor import PositionMonitor, CHECK_INTERVAL_MIN
+
+class FakeScraper:
+    """Counts get_market_data calls and returns a fixed price"""
+    def __init__(self):
+        self.fetches = 0
+
+    async def get_market_data(self, symbol, timeframe='1h'):
+        self.fetches += 1
+        return {'symbol': symbol, 'price': {'current': 100.0 + self.fetches}}
+
+async def test_fresh_price_per_tick():
+    print("🧪 Testing market data refresh per tick...")
+
+    monitor = PositionMonitor(client=None, db=None)
+    scraper = FakeScraper()
+    monitor._scraper = scraper
+    clock = [1000.0]
+
+    with mock.patch('time.monotonic', lambda: clock[0]):
+        # Positions and alerts checks of the same tick share one fetch
+        monitor._start_tick()
+        first = await monitor.get_market_data('BTCUSDT')
+        await monitor.get_market_data('BTCUSDT')
+        assert scraper.fetches == 1, scraper.fetches
+
+        # Next fast tick: the price is fetched again
+        clock[0] += CHECK_INTERVAL_MIN
+        monitor._start_tick()
+        second = await monitor.get_market_data('BTCUSDT')
+        assert scraper.fetches == 2, scraper.fetches
+        assert second['price']['current'] != first['price']['current']
+
+    print("✅ Two ticks 5s apart trigger two fetches")
+
+if __name__ == "__main__":
+    asyncio.run(test_fresh_price_per_tick())